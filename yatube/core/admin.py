@@ -0,0 +1,27 @@
+from django.contrib import admin
+
+from .models import StoredFile, Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created',
+    )
+    search_fields = ('name', 'key')
+    list_filter = ('status',)
+
+
+admin.site.register(Task, TaskAdmin)
+
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'references')
+    search_fields = ('name',)
+
+
+admin.site.register(StoredFile, StoredFileAdmin)
@@ -0,0 +1,288 @@
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .resp import Client, read_reply
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'cache:invalidate'
+FLUSH_MARKER = '*'
+
+
+class LocalTier:
+    """Ограниченный LRU в памяти процесса с коротким временем жизни.
+
+    Хранит сериализованные значения, чтобы изменения полученного объекта
+    не попадали в кеш, как и в LocMemCache.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item
+
+    def set(self, key, value, timeout):
+        ttl = self.timeout if timeout is None else min(timeout, self.timeout)
+        if ttl <= 0:
+            self.discard(key)
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def dumps(value):
+    # Целые числа хранятся как есть, чтобы работал INCRBY на сервере.
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    try:
+        return int(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+class TwoTierCache(BaseCache):
+    """Общий Redis-совместимый кеш с локальным L1 в каждом процессе.
+
+    Записи в L1 живут не дольше L1_TIMEOUT секунд. Каждая запись и
+    удаление публикуют ключ в канал инвалидации, и остальные процессы
+    выбрасывают его из своего L1, не дожидаясь истечения срока.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.client = Client(location, timeout=options.get('SOCKET_TIMEOUT'))
+        self.local = LocalTier(
+            options.get('L1_MAX_ENTRIES', 1000),
+            options.get('L1_TIMEOUT', 5),
+        )
+        self.channel = options.get('CHANNEL', CHANNEL)
+        self.node = uuid.uuid4().hex
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self._subscription = None
+        self.subscribed = threading.Event()
+        self._closed = threading.Event()
+
+    # Подписка на инвалидацию.
+
+    def _ensure_listener(self):
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen,
+                    name='cache-invalidation',
+                    daemon=True,
+                )
+                self._listener.start()
+
+    def _listen(self):
+        while not self._closed.is_set():
+            try:
+                connection = self.client.connect()
+                connection.execute('SUBSCRIBE', self.channel)
+                # Подписчик ждёт сообщений сколько угодно долго.
+                connection.sock.settimeout(None)
+            except OSError:
+                time.sleep(1)
+                continue
+            self._subscription = connection
+            # Пока подписки не было, сообщения могли потеряться.
+            self.local.clear()
+            self.subscribed.set()
+            try:
+                self._consume(connection)
+            except (ConnectionError, OSError, ValueError):
+                if not self._closed.is_set():
+                    logger.warning('Подписка на инвалидацию кеша прервалась.')
+            finally:
+                self.subscribed.clear()
+                connection.close()
+
+    def _consume(self, connection):
+        while not self._closed.is_set():
+            reply = read_reply(connection.stream)
+            if not isinstance(reply, list) or reply[0] != b'message':
+                continue
+            node, _, key = reply[2].decode().partition(' ')
+            if node == self.node:
+                continue
+            if key == FLUSH_MARKER:
+                self.local.clear()
+            else:
+                self.local.discard(key)
+
+    def _publish(self, *keys):
+        self.client.pipeline([
+            ('PUBLISH', self.channel, f'{self.node} {key}') for key in keys
+        ])
+
+    # Интерфейс BaseCache.
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _ttl(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _remaining(self, pttl):
+        # PTTL отдаёт -1 для ключа без срока жизни.
+        return None if pttl < 0 else pttl / 1000
+
+    def _expiry(self, ttl):
+        return [] if ttl is None else ['PX', int(ttl * 1000)]
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        self._ensure_listener()
+        item = self.local.get(key)
+        if item is not None:
+            return loads(item[1])
+        data, ttl = self.client.pipeline([('GET', key), ('PTTL', key)])
+        if data is None:
+            return default
+        self.local.set(key, data, self._remaining(ttl))
+        return loads(data)
+
+    def get_many(self, keys, version=None):
+        self._ensure_listener()
+        keys = {self._key(key, version): key for key in keys}
+        found, missing = {}, []
+        for key, original in keys.items():
+            item = self.local.get(key)
+            if item is None:
+                missing.append(key)
+            else:
+                found[original] = loads(item[1])
+        if missing:
+            values, *ttls = self.client.pipeline([
+                ('MGET', *missing), *(('PTTL', key) for key in missing)
+            ])
+            for key, data, ttl in zip(missing, values, ttls):
+                if data is not None:
+                    self.local.set(key, data, self._remaining(ttl))
+                    found[keys[key]] = loads(data)
+        return found
+
+    def _set(self, key, value, timeout, condition=None):
+        ttl = self._ttl(timeout)
+        if ttl is not None and ttl <= 0:
+            self._delete(key)
+            return False
+        data = dumps(value)
+        args = ['SET', key, data, *self._expiry(ttl)]
+        if condition:
+            args.append(condition)
+        stored = self.client.execute(*args) is not None
+        if stored:
+            self.local.set(key, data, ttl)
+            self._publish(key)
+        return stored
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, 'NX')
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), dumps(value))
+            for key, value in data.items()
+        ]
+        ttl = self._ttl(timeout)
+        if ttl is not None and ttl <= 0:
+            self._delete(*(key for key, _ in items))
+            return []
+        if items:
+            self.client.pipeline([
+                ('SET', key, value, *self._expiry(ttl))
+                for key, value in items
+            ])
+            for key, value in items:
+                self.local.set(key, value, ttl)
+            self._publish(*(key for key, _ in items))
+        return []
+
+    def _delete(self, *keys):
+        if not keys:
+            return
+        for key in keys:
+            self.local.discard(key)
+        self.client.execute('DEL', *keys)
+        self._publish(*keys)
+
+    def delete(self, key, version=None):
+        self._delete(self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        self._delete(*(self._key(key, version) for key in keys))
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        if self.local.get(key) is not None:
+            return True
+        return bool(self.client.execute('EXISTS', key))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self.client.execute('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        value, ttl = self.client.pipeline([
+            ('INCRBY', key, delta), ('PTTL', key)
+        ])
+        self.local.set(key, dumps(value), self._remaining(ttl))
+        self._publish(key)
+        return value
+
+    def clear(self):
+        self.local.clear()
+        self.client.execute('FLUSHDB')
+        self._publish(FLUSH_MARKER)
+
+    def close(self, **kwargs):
+        # Соединения держатся на поток и переиспользуются между запросами.
+        pass
+
+    def stop_listener(self):
+        self._closed.set()
+        if self._subscription is not None:
+            self._subscription.close()
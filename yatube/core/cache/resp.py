@@ -0,0 +1,142 @@
+import socket
+import threading
+from urllib.parse import urlparse
+
+DEFAULT_PORT = 6379
+
+
+class RespError(Exception):
+    """Сервер ответил ошибкой на команду."""
+
+
+def encode_command(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    """Читает из файла сокета один ответ RESP2."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('Соединение с сервером кеша закрыто.')
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode()
+    if kind == b'-':
+        raise RespError(payload.decode())
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RespError(f'Неизвестный тип ответа: {line!r}')
+
+
+def parse_url(url):
+    """redis://host:port/db -> (host, port, db)."""
+    parsed = urlparse(url)
+    db = parsed.path.strip('/')
+    return (
+        parsed.hostname or 'localhost',
+        parsed.port or DEFAULT_PORT,
+        int(db) if db else 0,
+    )
+
+
+class Connection:
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def send(self, *args):
+        self.sock.sendall(encode_command(*args))
+
+    def execute(self, *args):
+        self.send(*args)
+        return read_reply(self.stream)
+
+    def pipeline(self, commands):
+        """Отправляет несколько команд разом и читает все ответы."""
+        self.sock.sendall(b''.join(
+            encode_command(*command) for command in commands
+        ))
+        replies = []
+        for _ in commands:
+            # Ответы дочитываются до конца, чтобы не сбить соединение.
+            try:
+                replies.append(read_reply(self.stream))
+            except RespError as exc:
+                replies.append(exc)
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def close(self):
+        # shutdown будит поток, который ждёт ответа на этом сокете.
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Client:
+    """Клиент Redis-совместимого сервера, по соединению на поток."""
+
+    def __init__(self, url, timeout=None):
+        self.host, self.port, self.db = parse_url(url)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def connect(self, timeout=None):
+        return Connection(
+            self.host, self.port, self.db, timeout=timeout or self.timeout
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connect()
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+        self._local.connection = None
+
+    def execute(self, *args):
+        try:
+            return self._connection().execute(*args)
+        except (ConnectionError, OSError):
+            # Сервер мог перезапуститься: одна попытка на новом соединении.
+            self._reset()
+            return self._connection().execute(*args)
+
+    def pipeline(self, commands):
+        try:
+            return self._connection().pipeline(commands)
+        except (ConnectionError, OSError):
+            self._reset()
+            return self._connection().pipeline(commands)
+
+    def close(self):
+        self._reset()
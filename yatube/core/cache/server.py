@@ -0,0 +1,218 @@
+import socketserver
+import threading
+import time
+
+from .resp import RespError, read_reply
+
+
+class Store:
+    """Данные и подписки сервера, общие для всех соединений."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.databases = {}
+        self.channels = {}
+
+    def data(self, db):
+        return self.databases.setdefault(db, {})
+
+    def alive(self, db, key):
+        item = self.data(db).get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.data(db)[key]
+            return None
+        return item
+
+
+def _int(value):
+    return int(value.decode() if isinstance(value, bytes) else value)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Одно клиентское соединение: разбирает команды и отвечает в RESP2."""
+
+    def setup(self):
+        super().setup()
+        self.db = 0
+        self.write_lock = threading.Lock()
+        self.subscriptions = set()
+
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                break
+            if not isinstance(command, list) or not command:
+                self.reply(RespError('ERR protocol error'))
+                continue
+            name = command[0].decode().upper()
+            method = getattr(self, f'command_{name.lower()}', None)
+            if method is None:
+                self.reply(RespError(f"ERR unknown command '{name}'"))
+                continue
+            try:
+                reply = method(*command[1:])
+            except (TypeError, ValueError):
+                reply = RespError('ERR wrong arguments')
+            if reply is not NotImplemented:
+                self.reply(reply)
+
+    def finish(self):
+        store = self.server.store
+        with store.lock:
+            for channel in self.subscriptions:
+                store.channels.get(channel, set()).discard(self)
+        super().finish()
+
+    def reply(self, value):
+        with self.write_lock:
+            try:
+                self.wfile.write(self.encode(value))
+                self.wfile.flush()
+            except (OSError, ValueError):
+                # Клиент уже отключился.
+                pass
+
+    def encode(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, RespError):
+            return b'-%s\r\n' % str(value).encode()
+        if value is True:
+            return b'+OK\r\n'
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        if isinstance(value, str):
+            value = value.encode()
+        if isinstance(value, bytes):
+            return b'$%d\r\n%s\r\n' % (len(value), value)
+        return b'*%d\r\n' % len(value) + b''.join(
+            self.encode(item) for item in value
+        )
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def command_ping(self, *args):
+        return True
+
+    def command_select(self, db):
+        self.db = _int(db)
+        return True
+
+    def command_get(self, key):
+        with self.store.lock:
+            item = self.store.alive(self.db, key)
+        return None if item is None else item[0]
+
+    def command_mget(self, *keys):
+        with self.store.lock:
+            items = [self.store.alive(self.db, key) for key in keys]
+        return [None if item is None else item[0] for item in items]
+
+    def command_set(self, key, value, *options):
+        expires, condition = None, None
+        options = [option.decode().upper() for option in options]
+        while options:
+            option = options.pop(0)
+            if option == 'EX':
+                expires = time.monotonic() + _int(options.pop(0))
+            elif option == 'PX':
+                expires = time.monotonic() + _int(options.pop(0)) / 1000
+            elif option in ('NX', 'XX'):
+                condition = option
+            else:
+                raise ValueError(option)
+        with self.store.lock:
+            exists = self.store.alive(self.db, key) is not None
+            if condition == 'NX' and exists:
+                return None
+            if condition == 'XX' and not exists:
+                return None
+            self.store.data(self.db)[key] = (value, expires)
+        return True
+
+    def command_del(self, *keys):
+        deleted = 0
+        with self.store.lock:
+            for key in keys:
+                if self.store.alive(self.db, key) is not None:
+                    del self.store.data(self.db)[key]
+                    deleted += 1
+        return deleted
+
+    def command_pttl(self, key):
+        with self.store.lock:
+            item = self.store.alive(self.db, key)
+        if item is None:
+            return -2
+        if item[1] is None:
+            return -1
+        return max(int((item[1] - time.monotonic()) * 1000), 0)
+
+    def command_exists(self, *keys):
+        with self.store.lock:
+            return sum(
+                self.store.alive(self.db, key) is not None for key in keys
+            )
+
+    def command_incrby(self, key, delta):
+        with self.store.lock:
+            item = self.store.alive(self.db, key)
+            value, expires = item if item is not None else (b'0', None)
+            value = _int(value) + _int(delta)
+            self.store.data(self.db)[key] = (str(value).encode(), expires)
+        return value
+
+    def command_flushdb(self):
+        with self.store.lock:
+            self.store.data(self.db).clear()
+        return True
+
+    def command_publish(self, channel, message):
+        with self.store.lock:
+            subscribers = list(self.store.channels.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.reply([b'message', channel, message])
+        return len(subscribers)
+
+    def command_subscribe(self, *channels):
+        for channel in channels:
+            with self.store.lock:
+                self.store.channels.setdefault(channel, set()).add(self)
+            self.subscriptions.add(channel)
+            self.reply([b'subscribe', channel, len(self.subscriptions)])
+        return NotImplemented
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Redis-совместимый сервер в памяти для тестов и локальной разработки.
+
+    Понимает только команды, которые нужны бэкенду кеша.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        super().__init__(address, Handler)
+        self.store = Store()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
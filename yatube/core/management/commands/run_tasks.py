@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS,
+            help='Число процессов; 0 — выполнять в текущем процессе.',
+        )
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выйти, когда готовых задач не останется.',
+        )
+
+    def handle(self, *args, **options):
+        pool = None
+        if options['workers']:
+            pool = ProcessPoolExecutor(max_workers=options['workers'])
+        total = 0
+        try:
+            while True:
+                ids = tasks.claim(options['batch_size'])
+                if not ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                if pool is None:
+                    statuses = [tasks.execute(pk) for pk in ids]
+                else:
+                    # Дочерние процессы не должны унаследовать соединение.
+                    connections.close_all()
+                    statuses = list(pool.map(tasks.execute, ids))
+                total += len(statuses)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {total}.'))
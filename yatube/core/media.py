@@ -0,0 +1,153 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.module_loading import import_string
+from django.views.static import was_modified_since
+
+from .storage import is_content_addressed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def resolve(path):
+    """(путь, абсолютный путь) файла медиа или Http404.
+
+    Отдаются только файлы из MEDIA_SERVE_PREFIXES: никаких каталогов,
+    скрытых файлов (временные файлы хранилища начинаются с точки)
+    и выходов за MEDIA_ROOT. Последнее слово за MEDIA_ACCESS_CHECK:
+    файлы, на которые не ссылается ни одна видимая запись, не отдаются.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if not path.startswith(tuple(settings.MEDIA_SERVE_PREFIXES)):
+        raise Http404
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    if not import_string(settings.MEDIA_ACCESS_CHECK)(path):
+        raise Http404
+    return path, full_path
+
+
+def max_age(path):
+    """Год для неизменяемых имён, для старых имён — короткий срок."""
+    if path.startswith(settings.THUMBNAIL_PREFIX) or is_content_addressed(
+        path
+    ):
+        return settings.MEDIA_CACHE_MAX_AGE
+    return settings.MEDIA_LEGACY_CACHE_MAX_AGE
+
+
+def parse_range(header, size):
+    """(start, end) включительно для одного диапазона или None.
+
+    Несколько диапазонов не поддерживаются: тогда отдаётся весь файл.
+    Неудовлетворимый диапазон — ValueError.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(full_path, start, length):
+    with open(full_path, 'rb') as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _stream(request, full_path, stat, content_type):
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or (
+        parse_http_date_safe(if_range) == int(stat.st_mtime)
+    ):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        return FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(full_path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve(request, path):
+    """Отдаёт файл медиа сам или через фронтовой сервер.
+
+    MEDIA_SERVE_MODE: 'x-accel' — заголовок X-Accel-Redirect для nginx,
+    'x-sendfile' — X-Sendfile для Apache и lighttpd, 'django' — поток
+    FileResponse с Range и If-Modified-Since. Файл целиком в память
+    воркера не читается ни в одном режиме.
+    """
+    path, full_path = resolve(path)
+    stat = os.stat(full_path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime,
+        stat.st_size,
+    ):
+        return HttpResponseNotModified()
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    mode = settings.MEDIA_SERVE_MODE
+    if mode == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(path)
+        )
+    elif mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = _stream(request, full_path, stat, content_type)
+        if response.status_code == 416:
+            return response
+        response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = f'public, max-age={max_age(path)}'
+    return response
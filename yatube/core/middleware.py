@@ -0,0 +1,81 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import profiling, routers
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ProfilingMiddleware:
+    """Замеряет время, SQL и рендер шаблонов для части запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.is_sampled():
+            return self.get_response(request)
+        profile = profiling.start()
+        try:
+            # Обёртка на каждом соединении: чтения с реплик тоже считаются.
+            with ExitStack() as stack:
+                for db_connection in connections.all():
+                    stack.enter_context(
+                        db_connection.execute_wrapper(profile)
+                    )
+                response = self.get_response(request)
+        finally:
+            profiling.finish()
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        profiling.record(view_name, profile)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Читает безопасные запросы с реплик, а после записи — с основной.
+
+    Запрос, который что-то записал (POST или пишущий GET вроде подписки),
+    ставит cookie со временем, до которого этот браузер читает только
+    основную базу, чтобы автор сразу видел свой пост, комментарий или
+    подписку, даже если реплика ещё отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            self.stick_to_primary(response)
+            return response
+        if self.is_sticky(request):
+            return self.get_response(request)
+        with routers.read_from_replica():
+            response = self.get_response(request)
+            written = routers.has_written()
+        if written:
+            self.stick_to_primary(response)
+        return response
+
+    def is_sticky(self, request):
+        value = request.COOKIES.get(settings.REPLICA_STICKY_COOKIE, '')
+        try:
+            return float(value) > time.time()
+        except ValueError:
+            return False
+
+    def stick_to_primary(self, response):
+        window = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            settings.REPLICA_STICKY_COOKIE,
+            str(int(time.time() + window)),
+            max_age=window,
+            httponly=True,
+            samesite='Lax',
+        )
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -10,3 +11,57 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(CreatedModel):
+    """Отложенная задача очереди core.tasks."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    args = models.TextField('Аргументы в JSON', default='[]')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3
+    )
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+
+class StoredFile(models.Model):
+    """Счётчик ссылок на файл в хранилище с адресацией по содержимому."""
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
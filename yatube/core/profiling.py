@@ -0,0 +1,214 @@
+import logging
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('wall_ms', 'sql_ms', 'sql_count', 'template_ms')
+
+# Замеры воркеров лежат в общем кеше: процесс сайта их не видит иначе.
+SHARED_NAMES_KEY = 'profiling:shared'
+SHARED_KEY = 'profiling:shared:{}'
+
+_local = threading.local()
+_histograms = {}
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Скользящее окно последних значений одной метрики."""
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+
+    def add(self, value):
+        self.values.append(value)
+
+    def summary(self):
+        values = sorted(self.values)
+        if not values:
+            return {'count': 0}
+        # Корзины накопительные, как у гистограмм Prometheus.
+        buckets = {
+            f'<={bound}': bisect_right(values, bound)
+            for bound in settings.PROFILING_BUCKETS
+        }
+        buckets['+inf'] = len(values)
+        return {
+            'count': len(values),
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'p99': _percentile(values, 99),
+            'max': round(values[-1], 3),
+            'buckets': buckets,
+        }
+
+
+def _percentile(values, percent):
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return round(values[index], 3)
+
+
+class RequestProfile:
+    """Замеры одного запроса, которые собирают обёртки SQL и шаблонов."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_seconds = 0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+    def metrics(self):
+        return {
+            'wall_ms': (time.perf_counter() - self.started) * 1000,
+            'sql_ms': sum(duration for duration, _ in self.queries) * 1000,
+            'sql_count': len(self.queries),
+            'template_ms': self.template_seconds * 1000,
+        }
+
+
+def is_sampled():
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+def start():
+    _local.profile = RequestProfile()
+    return _local.profile
+
+
+def finish():
+    _local.profile = None
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def template_timer():
+    """Считает время только внешнего рендера, вложенные не суммируются."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    profile.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.template_depth -= 1
+        if not profile.template_depth:
+            profile.template_seconds += time.perf_counter() - started
+
+
+def _histograms_for(name, metrics):
+    with _lock:
+        histograms = _histograms.setdefault(name, {})
+        for metric in metrics:
+            if metric not in histograms:
+                histograms[metric] = Histogram(settings.PROFILING_WINDOW)
+        return histograms
+
+
+def observe(name, metric, value):
+    """Добавляет значение в гистограмму name вне замеров запросов.
+
+    Так подсистемы выкладывают свои счётчики рядом с метриками view.
+    """
+    _histograms_for(name, (metric,))[metric].add(value)
+
+
+def observe_shared(name, metric, value):
+    """observe для кода, который идёт и в воркерах run_tasks.
+
+    Окно значений хранится в общем кеше и попадает в snapshot() любого
+    процесса. Чтение-изменение-запись без блокировки: при гонке
+    значение может потеряться, для гистограмм это допустимо.
+    """
+    names = cache.get(SHARED_NAMES_KEY) or []
+    if name not in names:
+        cache.set(SHARED_NAMES_KEY, names + [name], None)
+    key = SHARED_KEY.format(name)
+    metrics = cache.get(key) or {}
+    values = metrics.setdefault(metric, [])
+    values.append(value)
+    del values[:-settings.PROFILING_WINDOW]
+    cache.set(key, metrics, None)
+
+
+def _shared_histograms():
+    names = cache.get(SHARED_NAMES_KEY) or []
+    stored = cache.get_many([SHARED_KEY.format(name) for name in names])
+    result = {}
+    for name in names:
+        for metric, values in stored.get(SHARED_KEY.format(name), {}).items():
+            histogram = Histogram(settings.PROFILING_WINDOW)
+            histogram.values.extend(values)
+            result.setdefault(name, {})[metric] = histogram
+    return result
+
+
+def record(view_name, profile):
+    """Добавляет замеры запроса в гистограммы его view."""
+    metrics = profile.metrics()
+    histograms = _histograms_for(view_name, METRICS)
+    for metric, value in metrics.items():
+        histograms[metric].add(value)
+    if metrics['wall_ms'] >= settings.PROFILING_SLOW_REQUEST_MS:
+        worst = sorted(profile.queries, reverse=True)
+        logger.warning(
+            'Медленный запрос %s: %.1f мс, SQL %d за %.1f мс, '
+            'шаблоны %.1f мс. Самые долгие запросы:\n%s',
+            view_name,
+            metrics['wall_ms'],
+            metrics['sql_count'],
+            metrics['sql_ms'],
+            metrics['template_ms'],
+            '\n'.join(
+                f'{duration * 1000:.1f} мс: {sql}'
+                for duration, sql in worst[:settings.PROFILING_SLOW_QUERIES]
+            ),
+        )
+    return metrics
+
+
+def snapshot():
+    with _lock:
+        merged = {
+            name: dict(histograms)
+            for name, histograms in _histograms.items()
+        }
+    for name, histograms in _shared_histograms().items():
+        merged.setdefault(name, {}).update(histograms)
+    items = merged.items()
+    return {
+        view_name: {
+            metric: histogram.summary()
+            for metric, histogram in histograms.items()
+        }
+        for view_name, histograms in sorted(items)
+    }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+    names = cache.get(SHARED_NAMES_KEY) or []
+    cache.delete_many(
+        [SHARED_NAMES_KEY] + [SHARED_KEY.format(name) for name in names]
+    )
@@ -0,0 +1,25 @@
+import math
+import time
+
+from django.core.cache import cache
+
+KEY = 'ratelimit:{}:{}'
+
+
+def take_token(scope, ident, rate, burst, now=None):
+    """Токен-бакет в кеше: burst действий подряд, затем rate в секунду.
+
+    Состояние — пара (токены, время) под одним ключом. Чтение и запись
+    не атомарны, так что при гонке пройдёт лишний запрос-другой; для
+    защиты базы от спама этого достаточно.
+    """
+    now = time.time() if now is None else now
+    key = KEY.format(scope, ident)
+    tokens, updated = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    # Полный бакет не отличается от отсутствующего ключа.
+    cache.set(key, (tokens, now), math.ceil((burst - tokens) / rate) or 1)
+    return allowed
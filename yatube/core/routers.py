@@ -0,0 +1,66 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_local = threading.local()
+
+# Сессии читаются только с основной базы: иначе после выхода
+# сессия ещё какое-то время оставалась бы живой на отстающей реплике.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+def current_replica():
+    if has_written():
+        return None
+    return getattr(_local, 'replica', None)
+
+
+def has_written():
+    """Была ли запись внутри текущего блока read_from_replica()."""
+    return getattr(_local, 'written', False)
+
+
+@contextmanager
+def read_from_replica():
+    """Направляет чтения внутри блока на одну случайную реплику.
+
+    После первой записи блок до конца читает основную базу: сигналы
+    и задачи, запущенные записью, не видят отставания реплики.
+    """
+    previous = getattr(_local, 'replica', None), has_written()
+    replicas = settings.DATABASE_REPLICAS
+    _local.replica = random.choice(replicas) if replicas else None
+    _local.written = False
+    try:
+        yield _local.replica
+    finally:
+        _local.replica, _local.written = previous
+
+
+class ReplicaRouter:
+    """Пишет в основную базу, а чтения размеченных запросов шлёт в реплику.
+
+    Вне read_from_replica() все запросы идут в основную базу, поэтому
+    команды управления и POST-запросы реплик не касаются. Внутри блока
+    любая запись переключает остаток блока на основную базу — так
+    GET-запросы, которые пишут (подписка), читают свои же записи.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica()
+        if replica is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        _local.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
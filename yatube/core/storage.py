@@ -0,0 +1,121 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import StoredFile
+
+CONTENT_NAME_RE = re.compile(r'^(.+/)?[0-9a-f]{2}/[0-9a-f]{62}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    """Имя выдано ContentAddressedStorage и никогда не сменит содержимое."""
+    return bool(CONTENT_NAME_RE.match(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются по sha256 содержимого внутри каталога upload_to.
+
+    Повторная загрузка того же файла не пишет ничего нового и получает
+    то же имя, а значит, и те же миниатюры sorl. Сохранение само берёт
+    ссылку на файл: под блокировкой строки счётчика, чтобы параллельное
+    удаление не стёрло файл между проверкой exists() и записью поста.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя означает одинаковое содержимое: суффиксы не нужны.
+        return name
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:] + extension
+        ).replace('\\', '/')
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        with transaction.atomic():
+            acquire(name)
+            if not self.exists(name):
+                self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Пишем во временный файл и атомарно переименовываем: две
+        # одновременные загрузки одного файла не увидят его недописанным.
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(
+                        chunk if isinstance(chunk, bytes) else chunk.encode()
+                    )
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def acquire(name, count=1):
+    """Отмечает ещё count ссылок на файл."""
+    with transaction.atomic():
+        stored, created = StoredFile.objects.select_for_update(
+        ).get_or_create(name=name, defaults={'references': count})
+        if not created:
+            StoredFile.objects.filter(pk=stored.pk).update(
+                references=F('references') + count
+            )
+
+
+def release(name):
+    """Снимает ссылку; True, если она была последней.
+
+    Строка счётчика остаётся до delete_unreferenced(): её блокировка
+    разделяет удаление и новую загрузку того же содержимого. Для файлов
+    без записи (загруженных до учёта ссылок) всегда False.
+    """
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name, references__gt=0
+        ).first()
+        if stored is None:
+            return False
+        stored.references -= 1
+        stored.save(update_fields=['references'])
+    return not stored.references
+
+
+def delete_unreferenced(name, delete, is_used):
+    """Вызывает delete(name), если на файл не осталось ссылок.
+
+    Проверка и удаление идут под блокировкой строки счётчика, поэтому
+    загрузка того же содержимого либо успевает взять ссылку раньше,
+    либо ждёт и пишет файл заново. is_used(name) — последняя проверка
+    записей, сославшихся на файл мимо счётчика. Файлы без строки
+    счётчика не удаляются. Возвращает True, если файл удалён.
+    """
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name
+        ).first()
+        if stored is None or stored.references or is_used(name):
+            return False
+        delete(name)
+        stored.delete()
+    return True
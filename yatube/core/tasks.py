@@ -0,0 +1,148 @@
+import json
+import logging
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    """Функция, которую можно выполнить сразу или поставить в очередь."""
+
+    def __init__(self, func, max_attempts=None):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args, key=None):
+        return enqueue(self.name, args, key, self.max_attempts)
+
+
+def task(func=None, *, max_attempts=None):
+    """Декоратор задачи: f.delay(*args, key=...) ставит вызов в очередь.
+
+    Аргументы должны сериализоваться в JSON.
+    """
+    if func is None:
+        return lambda func: TaskFunction(func, max_attempts)
+    return TaskFunction(func, max_attempts)
+
+
+def get_task(name):
+    function = import_string(name)
+    if not isinstance(function, TaskFunction):
+        raise ImportError(f'{name} не объявлена через @task')
+    return function
+
+
+def _run_eager(name, args):
+    # Как и воркер, ошибку задачи только логируем: побочный эффект
+    # не должен ронять запрос, который его поставил.
+    try:
+        get_task(name)(*args)
+    except Exception:
+        logger.exception('Задача %s упала', name)
+
+
+def enqueue(name, args=(), key=None, max_attempts=None):
+    """Записывает задачу в базу в текущей транзакции.
+
+    Воркер увидит её только после коммита, поэтому откат запроса
+    отменяет и побочные эффекты. Пока задача с тем же key ждёт или
+    выполняется, вторая не создаётся; после выполнения или отказа
+    ключ освобождается. При TASKS_EAGER функция выполняется в этом
+    же процессе, но тоже после коммита: так задача видит записи запроса,
+    а откат её отменяет.
+    """
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: _run_eager(name, args))
+        return None
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                args=json.dumps(list(args)),
+                key=key,
+                max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        if key is None:
+            raise
+        existing = Task.objects.filter(key=key).first()
+        if existing is None:
+            # Ключ освободился, пока мы пытались его занять.
+            return enqueue(name, args, key, max_attempts)
+        return existing
+
+
+def release_key(key):
+    """Освобождает ключ идемпотентности ждущей задачи.
+
+    Нужно, когда ключ описывает данные, которые удалены и могут
+    появиться снова: новая постановка не должна склеиться со старой.
+    """
+    Task.objects.filter(key=key).update(key=None)
+
+
+def claim(limit):
+    """Забирает до limit готовых задач и возвращает их id.
+
+    Взятая задача получает аренду на TASKS_LEASE секунд: если воркер
+    упадёт, по истечении аренды её заберёт другой.
+    """
+    now = timezone.now()
+    ready = Task.objects.filter(
+        status__in=(Task.PENDING, Task.RUNNING),
+        run_at__lte=now,
+        attempts__lt=F('max_attempts'),
+    )
+    ids = list(
+        ready.order_by('run_at').values_list('pk', flat=True)[:limit]
+    )
+    lease = now + timedelta(seconds=settings.TASKS_LEASE)
+    # Условный UPDATE по одной строке: из двух воркеров задачу получит один.
+    return [
+        pk for pk in ids
+        if ready.filter(pk=pk).update(
+            status=Task.RUNNING, run_at=lease, attempts=F('attempts') + 1
+        )
+    ]
+
+
+def execute(pk):
+    """Выполняет взятую задачу и записывает результат.
+
+    Завершённая задача (выполненная или исчерпавшая попытки) отдаёт
+    свой ключ идемпотентности: ту же работу можно поставить снова.
+    """
+    task = Task.objects.get(pk=pk)
+    try:
+        get_task(task.name)(*json.loads(task.args))
+    except Exception as error:
+        logger.exception('Задача %s упала', task)
+        task.last_error = repr(error)
+        if task.attempts >= task.max_attempts:
+            task.status = Task.FAILED
+            task.key = None
+        else:
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+    else:
+        task.status = Task.DONE
+        task.key = None
+    task.save(update_fields=['status', 'run_at', 'last_error', 'key'])
+    return task.status
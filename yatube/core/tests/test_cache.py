@@ -0,0 +1,89 @@
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache.backend import TwoTierCache
+from core.cache.server import RespServer
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RespServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def make_cache(self):
+        cache = TwoTierCache(self.server.url, {
+            'OPTIONS': {'L1_MAX_ENTRIES': 3, 'L1_TIMEOUT': 60},
+        })
+        self.addCleanup(cache.stop_listener)
+        return cache
+
+    def setUp(self):
+        self.first = self.make_cache()
+        self.second = self.make_cache()
+        self.first.clear()
+        self.second.clear()
+        for cache in (self.first, self.second):
+            cache.get('warmup')
+        # Оба процесса подписались на канал инвалидации.
+        self.assertTrue(self.first.subscribed.wait(2))
+        self.assertTrue(self.second.subscribed.wait(2))
+
+    def test_values_shared_between_processes(self):
+        """Значение, записанное одним процессом, видно другому."""
+        self.first.set('key', {'posts': [1, 2]})
+        self.assertEqual(self.second.get('key'), {'posts': [1, 2]})
+        self.assertEqual(
+            self.second.get_many(['key', 'missing']),
+            {'key': {'posts': [1, 2]}},
+        )
+        self.assertTrue(self.second.has_key('key'))
+
+    def test_local_tier_answers_without_server(self):
+        """Повторное чтение берётся из L1, а не с сервера."""
+        self.first.set('key', 'value')
+        self.server.store.data(0).clear()
+        self.assertEqual(self.first.get('key'), 'value')
+
+    def test_write_invalidates_other_local_tiers(self):
+        """Запись в одном процессе выбрасывает ключ из L1 других."""
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertTrue(wait_for(lambda: self.second.get('key') == 'new'))
+        self.first.delete('key')
+        self.assertTrue(wait_for(lambda: self.second.get('key') is None))
+
+    def test_local_tier_is_bounded(self):
+        """L1 вытесняет самые старые записи."""
+        for number in range(5):
+            self.first.set(f'key:{number}', number)
+        self.assertEqual(len(self.first.local.entries), 3)
+        self.assertEqual(self.first.get('key:0'), 0)
+
+    def test_add_incr_and_expiry(self):
+        """add, incr и время жизни ведут себя как у стандартных бэкендов."""
+        self.assertTrue(self.first.add('counter', 1))
+        self.assertFalse(self.second.add('counter', 5))
+        self.assertEqual(self.second.incr('counter', 2), 3)
+        self.assertTrue(wait_for(lambda: self.first.get('counter') == 3))
+        with self.assertRaises(ValueError):
+            self.first.incr('missing')
+        self.first.set('short', 'value', timeout=0.05)
+        self.first.local.clear()
+        self.assertTrue(wait_for(lambda: self.first.get('short') is None))
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.utils.http import http_date
+from PIL import Image
+
+from core.models import StoredFile
+from posts import thumbnails
+from posts.media import is_public
+from posts.models import Post
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+HASHED_NAME = 'posts/ab/' + 'c' * 62 + '.jpg'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVE_MODE='django')
+class ServeMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts'), exist_ok=True)
+        cls.path = os.path.join(MEDIA_ROOT, 'posts', 'image.jpg')
+        with open(cls.path, 'wb') as media_file:
+            media_file.write(b'0123456789')
+        with open(os.path.join(MEDIA_ROOT, 'posts', '.upload-1'), 'wb'):
+            pass
+        with open(os.path.join(MEDIA_ROOT, 'secret.txt'), 'wb'):
+            pass
+        for name in ('posts/orphan.jpg', HASHED_NAME, 'cache/ab/cd/x.jpg'):
+            os.makedirs(
+                os.path.dirname(os.path.join(MEDIA_ROOT, name)), exist_ok=True
+            )
+            with open(os.path.join(MEDIA_ROOT, name), 'wb'):
+                pass
+        author = User.objects.create_user(username='author')
+        for name in ('posts/image.jpg', HASHED_NAME):
+            Post.objects.create(author=author, text='Пост', image=name)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.url = '/media/posts/image.jpg'
+
+    def test_full_file_is_streamed(self):
+        """Файл отдаётся потоком с заголовками кеширования."""
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_ranges(self):
+        """Диапазоны отдаются с кодом 206, неудовлетворимые — 416."""
+        cases = {
+            'bytes=2-4': (206, b'234', 'bytes 2-4/10'),
+            'bytes=7-': (206, b'789', 'bytes 7-9/10'),
+            'bytes=-2': (206, b'89', 'bytes 8-9/10'),
+            'bytes=20-': (416, b'', 'bytes */10'),
+        }
+        for header, (status, body, content_range) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response['Content-Range'], content_range)
+                content = (
+                    b''.join(response.streaming_content)
+                    if response.streaming else response.content
+                )
+                self.assertEqual(content, body)
+
+    def test_not_modified(self):
+        """If-Modified-Since с датой файла даёт 304."""
+        response = self.client.get(
+            self.url,
+            HTTP_IF_MODIFIED_SINCE=http_date(os.stat(self.path).st_mtime),
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_forbidden_paths(self):
+        """Скрытые файлы, чужие каталоги и выход из MEDIA_ROOT — 404."""
+        for url in (
+            '/media/posts/.upload-1',
+            '/media/secret.txt',
+            '/media/posts/../secret.txt',
+            '/media/posts/',
+            '/media/posts/missing.jpg',
+            '/media/posts/orphan.jpg',
+            '/media/cache/ab/cd/x.jpg',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cache_lifetime_depends_on_name(self):
+        """Год кеша — только для имён по содержимому."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.MEDIA_LEGACY_CACHE_MAX_AGE}',
+        )
+        response = self.client.get('/media/' + HASHED_NAME)
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+        )
+
+    def test_counted_file_checked_by_counter(self):
+        """Имя по содержимому проверяется по счётчику ссылок, без постов."""
+        name = 'posts/12/' + '3' * 62 + '.jpg'
+        StoredFile.objects.create(name=name, references=1)
+        with self.assertNumQueries(1) as queries:
+            self.assertTrue(is_public(name))
+        self.assertIn('core_storedfile', queries.captured_queries[0]['sql'])
+        StoredFile.objects.filter(name=name).update(references=0)
+        self.assertFalse(is_public(name))
+
+    def test_thumbnail_of_post_image_served(self):
+        """Миниатюра, которую помнит sorl, отдаётся."""
+        name = 'posts/de/' + 'f' * 62 + '.png'
+        path = os.path.join(MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as image_file:
+            Image.new('RGB', (20, 20), 'red').save(image_file, 'PNG')
+        url = thumbnails.thumbnail_url(name)
+        self.assertTrue(url.startswith('/media/cache/'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_front_server_modes(self):
+        """В режимах x-accel и x-sendfile тело отдаёт фронтовой сервер."""
+        with self.settings(MEDIA_SERVE_MODE='x-accel'):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/image.jpg'
+        )
+        self.assertEqual(response.content, b'')
+        with self.settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.path)
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        profiling.reset()
+        self.client = Client()
+
+    def tearDown(self):
+        profiling.reset()
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_nothing_recorded_when_sampling_off(self):
+        """Без сэмплирования замеры не копятся."""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(profiling.snapshot(), {})
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_view_metrics_recorded(self):
+        """Время, SQL и шаблоны записываются под именем view."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        self.client.get(url)
+        stats = profiling.snapshot()['posts:post_detail']
+        self.assertEqual(stats['wall_ms']['count'], 2)
+        self.assertGreater(stats['sql_count']['max'], 0)
+        self.assertGreater(stats['template_ms']['max'], 0)
+        self.assertLessEqual(
+            stats['template_ms']['max'], stats['wall_ms']['max']
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_queries(self):
+        """Медленный запрос пишется в лог вместе с SQL."""
+        with self.assertLogs('core.profiling', 'WARNING') as logs:
+            self.client.get(
+                reverse('posts:post_detail', args=[self.post.pk])
+            )
+        self.assertIn('posts:post_detail', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_stats_only_for_staff(self):
+        """Статистику видит только персонал."""
+        url = reverse('profiling')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_shared_metrics_visible_from_other_process(self):
+        """Замеры воркера видны через общий кеш, а не память процесса."""
+        profiling.observe_shared('worker', 'push_ms', 3)
+        profiling.observe_shared('worker', 'push_ms', 5)
+        profiling._histograms.clear()
+        stats = profiling.snapshot()['worker']['push_ms']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['max'], 5)
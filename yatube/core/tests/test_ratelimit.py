@@ -0,0 +1,25 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.ratelimit import take_token
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_burst_then_refill(self):
+        """После burst действий ждём пополнения по rate."""
+        allowed = [
+            take_token('test', 1, rate=0.5, burst=3, now=100)
+            for _ in range(4)
+        ]
+        self.assertEqual(allowed, [True, True, True, False])
+        self.assertFalse(take_token('test', 1, rate=0.5, burst=3, now=101))
+        self.assertTrue(take_token('test', 1, rate=0.5, burst=3, now=102))
+
+    def test_buckets_are_separate(self):
+        """У каждого пользователя свой бакет."""
+        self.assertTrue(take_token('test', 1, rate=1, burst=1, now=100))
+        self.assertFalse(take_token('test', 1, rate=1, burst=1, now=100))
+        self.assertTrue(take_token('test', 2, rate=1, burst=1, now=100))
@@ -0,0 +1,123 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+from posts.models import Post
+
+User = get_user_model()
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика — файловая копия схемы основной базы, которая
+        # не получает новых записей, как сильно отстающий слейв.
+        cls.replica_dir = tempfile.mkdtemp()
+        path = os.path.join(cls.replica_dir, 'replica.sqlite3')
+        source = connections['default']
+        source.ensure_connection()
+        replica = sqlite3.connect(path)
+        source.connection.backup(replica)
+        replica.close()
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        User.objects.using(REPLICA).bulk_create([
+            User(pk=self.author.pk, username='author', password='!')
+        ])
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def test_reads_outside_requests_use_primary(self):
+        """Без разметки запроса чтения идут в основную базу."""
+        self.assertEqual(Post.objects.all().db, 'default')
+        with routers.read_from_replica():
+            self.assertEqual(Post.objects.all().db, REPLICA)
+            self.assertEqual(
+                Post.objects.create(author=self.author, text='Ещё').pk,
+                Post.objects.using('default').latest('pk').pk,
+            )
+
+    def test_get_reads_from_replica(self):
+        """GET читает реплику, где нового поста ещё нет."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_author_sticks_to_primary_after_write(self):
+        """После записи автор читает основную базу и видит комментарий."""
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий комментарий'},
+        )
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        response = client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_writing_get_sticks_to_primary(self):
+        """Подписка GET-запросом тоже включает чтение с основной базы."""
+        reader = User.objects.create_user(username='reader')
+        User.objects.using(REPLICA).bulk_create([
+            User(pk=reader.pk, username='reader', password='!')
+        ])
+        client = Client()
+        client.force_login(reader)
+        with routers.read_from_replica():
+            self.assertEqual(Post.objects.all().db, REPLICA)
+            Post.objects.create(author=self.author, text='Запись')
+            self.assertEqual(Post.objects.all().db, 'default')
+        response = client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_feed_cache_filled_from_primary(self):
+        """Лента из кэша не застревает на отставшей реплике."""
+        cache.clear()
+        self.assertContains(self.client.get(reverse('posts:index')), 'Пост')
+        client = Client()
+        client.force_login(self.author)
+        client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        for reader in (self.client, client):
+            self.assertContains(
+                reader.get(reverse('posts:index')), 'Новый пост'
+            )
+
+    def test_expired_sticky_cookie_ignored(self):
+        """Просроченная cookie не держит запросы на основной базе."""
+        self.client.cookies[settings.REPLICA_STICKY_COOKIE] = str(
+            time.time() - 1
+        )
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
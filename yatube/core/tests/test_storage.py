@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core import storage
+from core.models import StoredFile
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = storage.ContentAddressedStorage(location=self.root)
+
+    def test_same_content_same_name(self):
+        """Одинаковое содержимое сохраняется один раз под одним именем."""
+        first = self.storage.save('posts/a.JPG', ContentFile(b'picture'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'picture'))
+        other = self.storage.save('posts/a.jpg', ContentFile(b'another'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r'^posts/[0-9a-f]{2}/[0-9a-f]{62}\.jpg$')
+        with self.storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'picture')
+
+    def test_reference_counting(self):
+        """Файл освобождается только с последней ссылкой."""
+        name = self.storage.save('posts/x.jpg', ContentFile(b'picture'))
+        self.storage.save('posts/y.jpg', ContentFile(b'picture'))
+        self.assertFalse(storage.release(name))
+        self.assertTrue(storage.release(name))
+        self.assertFalse(storage.release(name))
+        self.assertFalse(storage.release('posts/unknown.jpg'))
+
+    def test_delete_unreferenced(self):
+        """Удаляется только файл без ссылок и без живых записей."""
+        name = self.storage.save('posts/x.jpg', ContentFile(b'picture'))
+        self.assertFalse(storage.delete_unreferenced(
+            name, self.storage.delete, lambda name: False
+        ))
+        storage.release(name)
+        self.assertFalse(storage.delete_unreferenced(
+            name, self.storage.delete, lambda name: True
+        ))
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(storage.delete_unreferenced(
+            name, self.storage.delete, lambda name: False
+        ))
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(storage.delete_unreferenced(
+            'posts/legacy.jpg', self.storage.delete, lambda name: False
+        ))
+
+    def test_save_rewrites_file_deleted_meanwhile(self):
+        """Загрузка после удаления пишет файл заново и берёт ссылку."""
+        name = self.storage.save('posts/x.jpg', ContentFile(b'picture'))
+        storage.release(name)
+        storage.delete_unreferenced(
+            name, self.storage.delete, lambda name: False
+        )
+        self.assertEqual(
+            self.storage.save('posts/x.jpg', ContentFile(b'picture')), name
+        )
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).references, 1)
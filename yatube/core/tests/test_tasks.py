@@ -0,0 +1,112 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@override_settings(TASKS_EAGER=False, TASKS_RETRY_DELAY=60)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        call_command('run_tasks', once=True, workers=0, stdout=StringIO())
+
+    def test_delay_enqueues_and_worker_runs(self):
+        """delay пишет задачу в базу, воркер выполняет её."""
+        task = record.delay(5)
+        self.assertEqual(task.name, 'core.tests.test_tasks.record')
+        self.assertEqual(json.loads(task.args), [5])
+        self.assertEqual(calls, [])
+        self.run_worker()
+        self.assertEqual(calls, [5])
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.DONE)
+
+    def test_idempotency_key(self):
+        """Ключ не даёт поставить вторую задачу, пока первая не выполнена."""
+        first = record.delay(1, key='once')
+        second = record.delay(2, key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.run_worker()
+        self.assertEqual(calls, [1])
+        third = record.delay(3, key='once')
+        self.assertNotEqual(third.pk, first.pk)
+        self.run_worker()
+        self.assertEqual(calls, [1, 3])
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача откладывается, после max_attempts — FAILED."""
+        task = explode.delay(key='explode')
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_worker()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('boom', task.last_error)
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_worker()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertIsNone(task.key)
+
+    def test_claim_is_exclusive_until_lease_expires(self):
+        """Взятую задачу не забирают повторно, пока не истекла аренда."""
+        task = record.delay(1)
+        self.assertEqual(tasks.claim(10), [task.pk])
+        self.assertEqual(tasks.claim(10), [])
+        Task.objects.filter(pk=task.pk).update(
+            run_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(tasks.claim(10), [task.pk])
+
+
+@override_settings(TASKS_EAGER=True)
+class EagerTaskTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_eager_runs_after_commit(self):
+        """В режиме TASKS_EAGER задача выполняется после коммита."""
+        with transaction.atomic():
+            self.assertIsNone(record.delay(3))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [3])
+        self.assertFalse(Task.objects.exists())
+
+    def test_eager_skipped_on_rollback(self):
+        """Откат транзакции отменяет и задачу."""
+        try:
+            with transaction.atomic():
+                record.delay(4)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(calls, [])
+
+    def test_eager_error_logged(self):
+        """Ошибка задачи в режиме TASKS_EAGER не доходит до вызывающего."""
+        with self.assertLogs('core.tasks', 'ERROR') as logs:
+            self.assertIsNone(explode.delay())
+        self.assertIn('explode', logs.output[0])
@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import media, profiling
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -13,3 +17,16 @@ def csrf_failure(request, reason=HTTPStatus.FORBIDDEN):
 
 def server_error(request, reason=HTTPStatus.INTERNAL_SERVER_ERROR):
     return render(request, 'core/500.html')
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Гистограммы замеров по каждому view, только для персонала."""
+    return JsonResponse(
+        profiling.snapshot(), json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def serve_media(request, path):
+    """Файлы MEDIA_ROOT: сам Django или X-Accel-Redirect/X-Sendfile."""
+    return media.serve(request, path)
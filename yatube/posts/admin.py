@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import AuthorStats, Comment, Follow, Group, Post
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -21,3 +21,4 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Follow)
 admin.site.register(Comment)
+admin.site.register(AuthorStats)
@@ -0,0 +1,203 @@
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from . import feed_cache, follow_graph
+from .comments import decode_comment_cursor, get_comment_page
+from .models import Group, Post, TimelineEntry
+from .timeline import get_timeline
+from .utils import get_paginator
+
+User = get_user_model()
+
+
+def _json(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def _versions(*scopes):
+    return feed_cache.get_versions(
+        (*scopes, feed_cache.GROUPS_SCOPE, feed_cache.AUTHORS_SCOPE)
+    )
+
+
+def conditional(get_state, private=False):
+    """ETag по версиям кеша лент; 304 — без рендера.
+
+    get_state возвращает части ETag — версии областей, которые сигналы
+    сдвигают при создании, правке и удалении поста, комментариях и
+    смене названий групп и имён авторов, — или None, если объекта нет.
+    Так проверка не агрегирует таблицу постов. Last-Modified не
+    отдаётся: удаление поста его не сдвигает.
+    """
+    def etag(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        if state is None:
+            return None
+        raw = ':'.join(str(part) for part in (
+            *state, request.user.pk if private else '',
+        ))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Личная лента не должна оседать в общих кешах, даже 304.
+            if private:
+                response['Cache-Control'] = 'private'
+            return response
+        return wrapper
+
+    return decorator
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'updated': post.updated.isoformat(),
+        'author': {
+            'username': post.author.username,
+            'full_name': post.author.get_full_name(),
+        },
+        'group': {
+            'slug': post.group.slug,
+            'title': post.group.title,
+        } if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_page(request, queryset):
+    """Страница ленты через get_paginator."""
+    context = get_paginator(queryset, request)
+    page_obj = context['page_obj']
+    data = {
+        'results': [serialize_post(post) for post in page_obj],
+        'next_cursor': context['next_cursor'],
+        'previous_cursor': context['previous_cursor'],
+    }
+    if context['paginator'] is not None:
+        data.update({
+            'count': context['paginator'].count,
+            'num_pages': context['paginator'].num_pages,
+            'page': page_obj.number,
+        })
+    return data
+
+
+def _index_state(request):
+    return _versions(feed_cache.INDEX_SCOPE)
+
+
+def _group_state(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return _versions(feed_cache.group_scope(group_id))
+
+
+def _profile_state(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return _versions(feed_cache.author_scope(author_id))
+
+
+def _post_state(request, post_id):
+    # Комментарии и правка поста сдвигают область его автора.
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return _versions(feed_cache.author_scope(author_id))
+
+
+def _follow_state(request):
+    # Записи ленты дописывают задачи уже после сдвига версий, поэтому
+    # в ETag входит и сама лента — по индексу (user, -pub_date).
+    timeline = TimelineEntry.objects.filter(
+        user=request.user
+    ).aggregate(last=Max('pub_date'), count=Count('pk'))
+    return (
+        *_versions(feed_cache.INDEX_SCOPE),
+        timeline['count'],
+        timeline['last'].timestamp() if timeline['last'] else 0,
+        hashlib.md5(
+            str(follow_graph.following_ids(request.user.pk)).encode()
+        ).hexdigest(),
+    )
+
+
+@require_safe
+@conditional(_index_state)
+def index(request):
+    return _json(serialize_page(request, Post.objects.for_feed()))
+
+
+@require_safe
+@conditional(_group_state)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = {'group': {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }}
+    data.update(serialize_page(request, group.posts.for_feed()))
+    return _json(data)
+
+
+@require_safe
+@conditional(_profile_state)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    data = {'author': {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+    }}
+    data.update(serialize_page(request, author.posts.for_feed()))
+    return _json(data)
+
+
+@require_safe
+@conditional(_post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    data = serialize_post(post)
+    comments, data['comments_next_cursor'] = get_comment_page(
+        post.pk, decode_comment_cursor(request.GET.get('comments'))
+    )
+    data['comments'] = [
+        {
+            'id': comment.pk,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        }
+        for comment in comments
+    ]
+    return _json(data)
+
+
+@login_required
+@require_safe
+@conditional(_follow_state, private=True)
+def follow_index(request):
+    return _json(serialize_page(request, get_timeline(request.user)))
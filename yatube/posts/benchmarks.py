@@ -0,0 +1,164 @@
+import json
+import random
+import statistics
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+
+from .importer import refresh_derived
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+USERNAME_PREFIX = 'bench_user_'
+
+
+def _bulk(model, objects):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, BATCH_SIZE))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+@transaction.atomic
+def seed(users=100, groups=10, posts=2000, comments=5000, follows=1000,
+         random_seed=0):
+    """Наполняет базу правдоподобными пользователями, постами и т.д."""
+    rnd = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    _bulk(User, (
+        User(
+            username=f'{USERNAME_PREFIX}{number}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password='!',
+        )
+        for number in range(users)
+    ))
+    _bulk(Group, (
+        Group(
+            title=fake.sentence(nb_words=3),
+            slug=f'bench-group-{number}',
+            description=fake.paragraph(),
+        )
+        for number in range(groups)
+    ))
+    user_ids = list(User.objects.filter(
+        username__startswith=USERNAME_PREFIX
+    ).values_list('pk', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-group-'
+    ).values_list('pk', flat=True)) + [None]
+    _bulk(Post, (
+        Post(
+            author_id=rnd.choice(user_ids),
+            group_id=rnd.choice(group_ids),
+            text=fake.paragraph(nb_sentences=rnd.randint(1, 8)),
+        )
+        for _ in range(posts)
+    ))
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids
+    ).values_list('pk', flat=True))
+    _bulk(Comment, (
+        Comment(
+            post_id=rnd.choice(post_ids),
+            author_id=rnd.choice(user_ids),
+            text=fake.sentence(),
+        )
+        for _ in range(comments)
+    ))
+    pairs = {
+        (user_ids[0], author_id)
+        for author_id in rnd.sample(user_ids[1:], min(50, users - 1))
+    }
+    while len(pairs) < min(follows, users * (users - 1)):
+        user_id, author_id = rnd.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    _bulk(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in pairs
+    ))
+    refresh_derived()
+    return user_ids[0]
+
+
+def endpoints():
+    """Адреса, которые прогоняет бенчмарк."""
+    post = Post.objects.order_by('-comments_count').first()
+    group = Group.objects.filter(slug__startswith='bench-group-').first()
+    author = User.objects.get(pk=post.author_id)
+    return {
+        'index': reverse('posts:index'),
+        'group_posts': reverse('posts:group_list', args=[group.slug]),
+        'profile': reverse('posts:profile', args=[author.username]),
+        'post_detail': reverse('posts:post_detail', args=[post.pk]),
+        'follow_index': reverse('posts:follow_index'),
+    }
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def run(reader_id, requests=50, cold=False):
+    """Прогоняет ленты через тестовый клиент и собирает метрики."""
+    client = Client()
+    client.force_login(User.objects.get(pk=reader_id))
+    results = {}
+    for name, url in endpoints().items():
+        timings, queries, sizes = [], [], []
+        for _ in range(requests):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            sizes.append(len(response.content))
+        results[name] = {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(_percentile(timings, 50), 3),
+            'p95_ms': round(_percentile(timings, 95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': round(statistics.mean(queries), 2),
+            'max_queries': max(queries),
+            'bytes': round(statistics.mean(sizes)),
+        }
+    return results
+
+
+def compare(previous, current):
+    """Строки с изменением метрик относительно прошлого прогона."""
+    lines = []
+    for name, metrics in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if before is None:
+            continue
+        changes = []
+        for metric in ('p50_ms', 'p95_ms', 'queries', 'bytes'):
+            old, new = before[metric], metrics[metric]
+            delta = (new - old) / old * 100 if old else 0
+            changes.append(f'{metric} {old} -> {new} ({delta:+.1f}%)')
+        lines.append(f'{name}: ' + ', '.join(changes))
+    return lines
+
+
+def dump(report, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment
+from .utils import decode_token, encode_token
+
+
+def encode_comment_cursor(comment):
+    return encode_token(comment.created.isoformat(), comment.pk)
+
+
+def decode_comment_cursor(token):
+    """Возвращает (created, id) или None для пустого и битого токена."""
+    if not token:
+        return None
+    parts = decode_token(token)
+    try:
+        created, pk = parts
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if created is None:
+        return None
+    return created, pk
+
+
+def get_comment_page(post_id, cursor=None):
+    """Комментарии от старых к новым, COMMENTS_PER_PAGE штук после cursor.
+
+    Запрос идёт по индексу (post, created) и не зависит от того, сколько
+    всего комментариев у поста.
+    """
+    per_page = settings.COMMENTS_PER_PAGE
+    comments = Comment.objects.filter(post_id=post_id)
+    if cursor is not None:
+        created, pk = cursor
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    comments = list(
+        comments.select_related('author').order_by('created', 'pk')[
+            :per_page + 1
+        ]
+    )
+    next_cursor = None
+    if len(comments) > per_page:
+        comments = comments[:per_page]
+        next_cursor = encode_comment_cursor(comments[-1])
+    return comments, next_cursor
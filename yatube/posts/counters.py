@@ -0,0 +1,81 @@
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def author_stats(user):
+    """Счётчики автора; для автора без записи — нулевые."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def _count_author(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def bump_author(user_id, field, delta):
+    """Атомарно сдвигает счётчик автора на delta."""
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id, defaults=_count_author(user_id)
+        )
+
+
+def bump_comments(post_id, delta):
+    """Атомарно сдвигает счётчик комментариев поста на delta."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _grouped_counts(queryset, field):
+    return dict(
+        queryset.values_list(field).annotate(total=Count('pk')).order_by()
+    )
+
+
+@transaction.atomic
+def reconcile(batch_size=1000):
+    """Пересчитывает все счётчики пакетно; возвращает число авторов."""
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).values('post').annotate(total=Count('pk')).values('total')
+    Post.objects.update(
+        comments_count=Coalesce(Subquery(comments), Value(0))
+    )
+    posts = _grouped_counts(Post.objects.all(), 'author')
+    followers = _grouped_counts(Follow.objects.all(), 'author')
+    following = _grouped_counts(Follow.objects.all(), 'user')
+    AuthorStats.objects.all().delete()
+    user_ids = User.objects.values_list('pk', flat=True).iterator()
+    total = 0
+    while True:
+        batch = [
+            AuthorStats(
+                user_id=user_id,
+                posts_count=posts.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0),
+            )
+            for user_id in islice(user_ids, batch_size)
+        ]
+        if not batch:
+            return total
+        AuthorStats.objects.bulk_create(batch)
+        total += len(batch)
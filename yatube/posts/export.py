@@ -0,0 +1,117 @@
+import json
+import zipfile
+
+from django.conf import settings
+
+from .models import Comment, Post
+
+JSONL = 'jsonl'
+ZIP = 'zip'
+FORMATS = (JSONL, ZIP)
+
+CONTENT_TYPES = {
+    JSONL: 'application/x-ndjson',
+    ZIP: 'application/zip',
+}
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def post_rows(author):
+    """Посты автора по одному, без загрузки всей выборки в память."""
+    posts = Post.objects.filter(author=author).order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'updated', 'group__slug', 'image',
+    )
+    for pk, text, pub_date, updated, group, image in posts.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        yield {
+            'id': pk,
+            'text': text,
+            'pub_date': _isoformat(pub_date),
+            'updated': _isoformat(updated),
+            'group': group,
+            'image': image or None,
+            'image_url': settings.MEDIA_URL + image if image else None,
+        }
+
+
+def comment_rows(author):
+    """Комментарии автора по одному, с id поста, к которому они оставлены."""
+    comments = Comment.objects.filter(author=author).order_by(
+        'pk'
+    ).values_list('pk', 'post_id', 'text', 'created')
+    for pk, post_id, text, created in comments.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        yield {
+            'id': pk,
+            'post': post_id,
+            'text': text,
+            'created': _isoformat(created),
+        }
+
+
+def _line(kind, row):
+    return (json.dumps(
+        {'type': kind, **row}, ensure_ascii=False
+    ) + '\n').encode()
+
+
+def jsonl_chunks(author):
+    """Посты и комментарии одной лентой JSON Lines с полем type."""
+    for row in post_rows(author):
+        yield _line('post', row)
+    for row in comment_rows(author):
+        yield _line('comment', row)
+
+
+class _Buffer:
+    """Файл только для записи, содержимое которого забирается кусками."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_chunks(author):
+    """ZIP с posts.jsonl и comments.jsonl, собранный на лету.
+
+    Архив пишется в поток без seek, поэтому zipfile ставит
+    дескрипторы данных после каждого файла и не возвращается назад.
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, kind, rows in (
+            ('posts.jsonl', 'post', post_rows(author)),
+            ('comments.jsonl', 'comment', comment_rows(author)),
+        ):
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for row in rows:
+                    member.write(_line(kind, row))
+                    if buffer.chunks:
+                        yield buffer.drain()
+    yield buffer.drain()
+
+
+def export_chunks(author, export_format):
+    if export_format == ZIP:
+        return zip_chunks(author)
+    return jsonl_chunks(author)
+
+
+def filename(author, export_format):
+    return f'yatube-{author.username}.{export_format}'
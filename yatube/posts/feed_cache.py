@@ -0,0 +1,130 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import DEFAULT_DB_ALIAS
+
+from core import routers
+
+from . import feed_items
+from .utils import CursorPage, get_paginator, pagination_query
+
+VERSION_KEY = 'feed:version:{}'
+PAGE_KEY = f'feed:page:v{feed_items.FORMAT_VERSION}:{{}}:{{}}'
+LOCK_SUFFIX = ':lock'
+
+INDEX_SCOPE = 'index'
+GROUPS_SCOPE = 'groups'
+# Сдвигается при смене имени любого автора: имена и ссылки на профили
+# лежат в каждой ленте, карточке и ответе API.
+AUTHORS_SCOPE = 'authors'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def _initial_version():
+    # Если ключ версии вытеснен, новая версия не совпадёт со старыми.
+    return time.time_ns() // 1000
+
+
+def get_versions(scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump(*scopes):
+    """Инвалидирует все страницы перечисленных областей."""
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def _page_key(request):
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return f'cursor:{cursor}'
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 1
+    return f'page:{number}'
+
+
+def _dump(context):
+    page_obj = context['page_obj']
+    items = feed_items.dumps(page_obj)
+    if context['paginator'] is None:
+        return ('cursor', items)
+    return ('page', items, page_obj.number, page_obj.paginator.count)
+
+
+def _load(payload, request, queryset, next_cursor, previous_cursor):
+    items = feed_items.loads(payload[1])
+    if payload[0] == 'cursor':
+        page_obj = CursorPage(items, next_cursor, previous_cursor)
+        paginator = None
+    else:
+        paginator = Paginator(queryset, settings.AMOUNT_POSTS)
+        paginator.count = payload[3]
+        page_obj = Page(items, payload[2], paginator)
+    return {
+        'paginator': paginator,
+        'page_number': getattr(page_obj, 'number', None),
+        'page_obj': page_obj,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
+        'pagination_query': pagination_query(request),
+    }
+
+
+def get_cached_paginator(queryset, request, scopes, count=None):
+    """get_paginator с версионным кэшем и защитой от лавины запросов.
+
+    Пока одна ветка пересчитывает устаревшую страницу под блокировкой,
+    остальные отдают предыдущую копию, а не идут в базу.
+    Промах читает основную базу: страница с отстающей реплики
+    легла бы в кэш под новой версией до конца его срока.
+    """
+    version = get_versions(scopes)
+    key = PAGE_KEY.format('|'.join(scopes), _page_key(request))
+    entry = cache.get(key)
+    lock_key = key + LOCK_SUFFIX
+    now = time.time()
+    if entry is not None:
+        entry_version, fresh_until, payload, cursors = entry
+        if entry_version == version and now < fresh_until:
+            return _load(payload, request, queryset, *cursors)
+        if not cache.add(lock_key, 1, settings.FEED_CACHE_LOCK_TIMEOUT):
+            return _load(payload, request, queryset, *cursors)
+    if routers.current_replica() is not None:
+        # Счётчик тоже прочитан с реплики.
+        queryset, count = queryset.using(DEFAULT_DB_ALIAS), None
+    try:
+        context = get_paginator(queryset, request, count=count)
+        payload = _dump(context)
+        cursors = (context['next_cursor'], context['previous_cursor'])
+        cache.set(
+            key,
+            (version, now + settings.FEED_CACHE_TIMEOUT, payload, cursors),
+            settings.FEED_CACHE_TIMEOUT + settings.FEED_CACHE_STALE_TIMEOUT,
+        )
+    finally:
+        if entry is not None:
+            cache.delete(lock_key)
+    # Промах отдаёт те же элементы ленты, что и попадание в кэш.
+    return _load(payload, request, queryset, *cursors)
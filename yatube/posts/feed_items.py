@@ -0,0 +1,164 @@
+import marshal
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils.text import Truncator
+
+from . import thumbnails
+
+# Меняется вместе с составом кортежа, чтобы не читать старые записи кэша.
+FORMAT_VERSION = 2
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class FeedAuthor:
+    __slots__ = ('username', 'full_name')
+
+    def __init__(self, username, full_name):
+        self.username = username
+        self.full_name = full_name
+
+    def __str__(self):
+        return self.username
+
+    def get_full_name(self):
+        return self.full_name
+
+
+class FeedGroup:
+    __slots__ = ('slug', 'title')
+
+    def __init__(self, slug, title):
+        self.slug = slug
+        self.title = title
+
+    def __str__(self):
+        return self.title
+
+
+class FeedItem:
+    """Пост ленты без состояния модели: только то, что рисует карточка.
+
+    В кэш уходит плоский кортеж из строк и чисел, упакованный marshal.
+    """
+
+    __slots__ = (
+        'pk', 'author', 'group', 'pub_timestamp', 'updated_timestamp',
+        'text', 'image', 'thumbnail_url', 'comments_count',
+        'image_width', 'image_height', 'image_placeholder',
+    )
+
+    def __init__(self, pk, author, group, pub_timestamp, updated_timestamp,
+                 text, image, thumbnail_url, comments_count,
+                 image_width, image_height, image_placeholder):
+        self.pk = pk
+        self.author = author
+        self.group = group
+        self.pub_timestamp = pub_timestamp
+        self.updated_timestamp = updated_timestamp
+        self.text = text
+        self.image = image
+        self.thumbnail_url = thumbnail_url
+        self.comments_count = comments_count
+        self.image_width = image_width
+        self.image_height = image_height
+        self.image_placeholder = image_placeholder
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def pub_date(self):
+        return _datetime(self.pub_timestamp)
+
+    @property
+    def updated(self):
+        return _datetime(self.updated_timestamp)
+
+    @property
+    def thumbnail_size(self):
+        return thumbnails.thumbnail_size(self.image_width, self.image_height)
+
+    def __eq__(self, other):
+        if isinstance(other, FeedItem):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __repr__(self):
+        return f'<FeedItem {self.pk}>'
+
+    @classmethod
+    def from_post(cls, post):
+        group = post.group if post.group_id else None
+        return cls(
+            post.pk,
+            FeedAuthor(post.author.username, post.author.get_full_name()),
+            FeedGroup(group.slug, group.title) if group else None,
+            post.pub_date.timestamp(),
+            post.updated.timestamp(),
+            Truncator(post.text or '').chars(settings.FEED_TEXT_LENGTH),
+            post.image.name or '',
+            thumbnails.thumbnail_url(post.image.name),
+            post.comments_count,
+            post.image_width,
+            post.image_height,
+            post.image_placeholder,
+        )
+
+    def to_tuple(self):
+        return (
+            self.pk,
+            self.author.username,
+            self.author.full_name,
+            self.group.slug if self.group else None,
+            self.group.title if self.group else None,
+            self.pub_timestamp,
+            self.updated_timestamp,
+            self.text,
+            self.image,
+            self.thumbnail_url,
+            self.comments_count,
+            self.image_width,
+            self.image_height,
+            self.image_placeholder,
+        )
+
+    @classmethod
+    def from_tuple(cls, row):
+        (pk, username, full_name, group_slug, group_title, pub_timestamp,
+         updated_timestamp, text, image, thumbnail_url, comments_count,
+         image_width, image_height, image_placeholder) = row
+        return cls(
+            pk,
+            FeedAuthor(username, full_name),
+            FeedGroup(group_slug, group_title) if group_slug else None,
+            pub_timestamp,
+            updated_timestamp,
+            text,
+            image,
+            thumbnail_url,
+            comments_count,
+            image_width,
+            image_height,
+            image_placeholder,
+        )
+
+
+def dumps(posts):
+    """Упаковывает посты или элементы ленты в компактные байты."""
+    return marshal.dumps([
+        (post if isinstance(post, FeedItem) else FeedItem.from_post(post))
+        .to_tuple()
+        for post in posts
+    ])
+
+
+def loads(data):
+    return [FeedItem.from_tuple(row) for row in marshal.loads(data)]
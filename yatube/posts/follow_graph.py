@@ -0,0 +1,116 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Follow
+
+FOLLOWING_KEY = 'follow:following:{}'
+FOLLOWERS_KEY = 'follow:followers:{}'
+
+# Отсортированный массив 64-битных id: в кеше это просто байты.
+TYPECODE = 'q'
+
+
+def _pack(ids):
+    return array(TYPECODE, sorted(ids)).tobytes()
+
+
+def _unpack(data):
+    ids = array(TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+
+def _load(template, column, other, owner_ids):
+    """Массивы id для владельцев owner_ids: из кеша, промахи — из базы."""
+    keys = {owner_id: template.format(owner_id) for owner_id in owner_ids}
+    cached = cache.get_many(keys.values())
+    result = {
+        owner_id: _unpack(cached[key])
+        for owner_id, key in keys.items() if key in cached
+    }
+    missing = [owner_id for owner_id in keys if owner_id not in result]
+    if missing:
+        loaded = {owner_id: [] for owner_id in missing}
+        # Только основная база: отставание реплики осело бы в кеше
+        # на весь FOLLOW_GRAPH_TIMEOUT.
+        rows = Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+            **{f'{column}__in': missing}
+        ).values_list(column, other)
+        for owner_id, other_id in rows.iterator():
+            loaded[owner_id].append(other_id)
+        packed = {
+            keys[owner_id]: _pack(ids) for owner_id, ids in loaded.items()
+        }
+        cache.set_many(packed, settings.FOLLOW_GRAPH_TIMEOUT)
+        result.update(
+            (owner_id, _unpack(packed[keys[owner_id]]))
+            for owner_id in missing
+        )
+    return result
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def following_ids(user_id):
+    """Отсортированные id авторов, на которых подписан пользователь."""
+    return _load(FOLLOWING_KEY, 'user_id', 'author_id', [user_id])[user_id]
+
+
+def follower_ids(author_id):
+    """Отсортированные id подписчиков автора."""
+    return _load(
+        FOLLOWERS_KEY, 'author_id', 'user_id', [author_id]
+    )[author_id]
+
+
+def following_map(user_ids):
+    """Подписки сразу нескольких пользователей одним get_many."""
+    return _load(FOLLOWING_KEY, 'user_id', 'author_id', user_ids)
+
+
+def is_following(user_id, author_id):
+    if not user_id or not author_id:
+        return False
+    return _contains(following_ids(user_id), author_id)
+
+
+def relation(user_id, other_id):
+    """(user читает other, other читает user) за один поход в кеш."""
+    if not user_id or not other_id:
+        return False, False
+    graph = following_map([user_id, other_id])
+    return (
+        _contains(graph[user_id], other_id),
+        _contains(graph[other_id], user_id),
+    )
+
+
+def is_mutual(user_id, other_id):
+    return all(relation(user_id, other_id))
+
+
+def mutual_ids(user_id):
+    """Id тех, с кем пользователь подписан друг на друга."""
+    followers = follower_ids(user_id)
+    return [
+        author_id for author_id in following_ids(user_id)
+        if _contains(followers, author_id)
+    ]
+
+
+def invalidate(user_id, author_id):
+    """Сбрасывает оба массива ребра: сейчас и ещё раз после коммита.
+
+    Второй сброс не даёт закешировать состояние, прочитанное
+    параллельным запросом до коммита подписки.
+    """
+    keys = [FOLLOWING_KEY.format(user_id), FOLLOWERS_KEY.format(author_id)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,5 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
+from . import images
 from .models import Comment, Post
 
 
@@ -8,6 +12,56 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Слишком большой файл убираем до валидации поля, чтобы Pillow
+        # его не открывал; ошибку поля добавит clean().
+        image = self.files.get('image')
+        self.image_too_large = image is not None and (
+            isinstance(image, images.OversizedUpload)
+            or image.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        )
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_too_large:
+            self.add_error('image', forms.ValidationError(
+                'Картинка больше %(limit)s.',
+                code='file_too_large',
+                params={'limit': filesizeformat(
+                    settings.POST_IMAGE_MAX_UPLOAD_SIZE
+                )},
+            ))
+        return cleaned_data
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        self.processed_image = None
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            self.processed_image = images.process(image)
+        except (OSError, ValueError) as error:
+            raise forms.ValidationError(
+                'Не удалось обработать картинку: %(error)s',
+                code='invalid_image',
+                params={'error': error},
+            )
+        return self.processed_image.content
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            processed = self.processed_image
+            self.instance.image_width = processed and processed.width
+            self.instance.image_height = processed and processed.height
+            self.instance.image_placeholder = (
+                processed.placeholder if processed else ''
+            )
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
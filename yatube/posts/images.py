@@ -0,0 +1,132 @@
+import base64
+import io
+import os
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageFilter, ImageOps
+
+
+class OversizedUpload(UploadedFile):
+    """Заглушка вместо файла, превысившего лимит: содержимое не хранится."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(io.BytesIO(), name, content_type, size)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Первый обработчик загрузки: отсекает файлы больше лимита.
+
+    До лимита куски идут дальше по цепочке (в память или во временный
+    файл). После лимита они отбрасываются, а вместо файла форма получает
+    OversizedUpload и отвечает ошибкой, не открывая картинку. Считаются
+    байты самого файла: content_length — это всё тело запроса.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.oversized = True
+        if self.oversized:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.oversized:
+            return OversizedUpload(
+                self.file_name, self.content_type, file_size
+            )
+        return None
+
+
+def limit_image_uploads(view):
+    """Ставит LimitedUploadHandler первым только для этого view.
+
+    Обработчики меняются до чтения тела, а CsrfViewMiddleware читает
+    request.POST раньше view, поэтому проверка CSRF переезжает внутрь.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, LimitedUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+@dataclass
+class ProcessedImage:
+    content: ContentFile
+    width: int
+    height: int
+    placeholder: str
+
+
+def _placeholder(image):
+    """Крошечное размытое превью в data URI — фон, пока грузится картинка."""
+    preview = image.convert('RGB')
+    preview.thumbnail(
+        (settings.POST_IMAGE_PLACEHOLDER_SIZE,) * 2, Image.BILINEAR
+    )
+    preview = preview.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    preview.save(buffer, 'JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def process(upload):
+    """Пережимает загруженную картинку и измеряет её.
+
+    Большие стороны ужимаются до POST_IMAGE_MAX_SIZE, поворот из EXIF
+    применяется. Непрозрачные картинки сохраняются в прогрессивный JPEG,
+    с альфа-каналом — в PNG. Анимация не пережимается, только измеряется.
+    Ошибки Pillow пробрасываются: форма превращает их в ошибку поля.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValueError('Слишком большое разрешение картинки.')
+    stem = os.path.splitext(os.path.basename(upload.name))[0] or 'image'
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return ProcessedImage(
+            ContentFile(upload.read(), name=os.path.basename(upload.name)),
+            width,
+            height,
+            _placeholder(image),
+        )
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+    buffer = io.BytesIO()
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha:
+        image.save(buffer, 'PNG', optimize=True)
+        extension = 'png'
+    else:
+        image.convert('RGB').save(
+            buffer,
+            'JPEG',
+            quality=settings.POST_IMAGE_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        extension = 'jpg'
+    return ProcessedImage(
+        ContentFile(buffer.getvalue(), name=f'{stem}.{extension}'),
+        image.width,
+        image.height,
+        _placeholder(image),
+    )
@@ -0,0 +1,73 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.models import Comment, Follow, Post
+from posts.timeline import celebrity_ids, get_timeline
+
+User = get_user_model()
+
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?(?P<table>\w+)(?!.*USING)'),
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+}
+
+
+def feed_queries(sample_id):
+    """Запросы лент и страниц, которые должны идти по индексам."""
+    user = User(pk=sample_id)
+    return {
+        'index': Post.objects.all(),
+        'group_posts': Post.objects.filter(group_id=sample_id),
+        'profile': Post.objects.filter(author_id=sample_id),
+        'follow_index inbox': get_timeline(user).inbox,
+        'follow_index pulled': Post.objects.filter(
+            author_id__in=[sample_id]
+        ).order_by('-pub_date', '-pk'),
+        'follow_index celebrities': celebrity_ids(user),
+        'post_detail comments': Comment.objects.filter(
+            post_id=sample_id
+        ).order_by('created'),
+        'profile following': Follow.objects.filter(
+            user_id=sample_id, author_id=sample_id
+        ),
+        'media access': Post.objects.filter(image=f'posts/{sample_id}.jpg'),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Проверяет планы запросов лент и сообщает о полных сканах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sample-id', type=int, default=1,
+            help='id пользователя, группы и поста для подстановки в запросы.',
+        )
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f'EXPLAIN для {connection.vendor} не поддерживается.'
+            )
+        problems = []
+        for name, queryset in feed_queries(options['sample_id']).items():
+            plan = queryset[:1].explain()
+            scans = [
+                line for line in plan.splitlines() if pattern.search(line)
+            ]
+            if scans:
+                problems.append(name)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}'))
+                for line in scans:
+                    self.stdout.write(f'    {line.strip()}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok         {name}'))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+        if problems:
+            raise CommandError(
+                'Полный скан таблицы в запросах: ' + ', '.join(problems)
+            )
@@ -0,0 +1,92 @@
+import json
+import platform
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmarks
+
+# Свой кеш на время прогона: CACHE_URL может указывать на общий Redis,
+# а бенчмарк чистит кеш и пишет в него ленты из фальшивых данных.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark_feeds',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет отдельную тестовую базу и меряет задержку, число '
+        'запросов и размер ответа лент.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument('--output', help='Куда записать отчёт JSON.')
+        parser.add_argument(
+            '--compare', help='Отчёт прошлого прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            results = self.measure(volumes, options)
+        report = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'cold': options['cold'],
+                'volumes': volumes,
+            },
+            'results': results,
+        }
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:<13} p50 {metrics['p50_ms']:>8} ms  "
+                f"p95 {metrics['p95_ms']:>8} ms  "
+                f"queries {metrics['queries']:>6}  "
+                f"bytes {metrics['bytes']:>8}"
+            )
+        if options['output']:
+            benchmarks.dump(report, options['output'])
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in benchmarks.compare(json.load(previous), report):
+                    self.stdout.write(line)
+
+    def measure(self, volumes, options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.perf_counter()
+            reader_id = benchmarks.seed(random_seed=options['seed'], **volumes)
+            self.stdout.write(
+                f'База наполнена за {time.perf_counter() - started:.1f} с.'
+            )
+            return benchmarks.run(
+                reader_id, options['requests'], options['cold']
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
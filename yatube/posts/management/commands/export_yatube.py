@@ -0,0 +1,42 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты и комментарии автора в JSON Lines или ZIP.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default=export.JSONL,
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        chunks = export.export_chunks(author, options['format'])
+        if options['output'] is None:
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
+            return
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка сохранена в {options["output"]}.'
+        ))
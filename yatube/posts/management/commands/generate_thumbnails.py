@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Заранее создаёт миниатюры для всех картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().order_by()
+        total = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for _ in pool.map(generate_in_worker, names.iterator()):
+                total += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Миниатюры созданы для {total} картинок.')
+        )
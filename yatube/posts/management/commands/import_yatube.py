@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import KINDS, Importer, read_rows, refresh_derived
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пользователей, группы, посты, комментарии и подписки '
+        'из JSON Lines или CSV пакетами bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        for kind in KINDS:
+            parser.add_argument(
+                f'--{kind}', metavar='PATH',
+                help='Файл .jsonl или .csv.',
+            )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        if not any(options[kind] for kind in KINDS):
+            raise CommandError('Укажите хотя бы один файл для загрузки.')
+        importer = Importer(batch_size=options['batch_size'])
+        started = time.perf_counter()
+        total = 0
+        for kind in KINDS:
+            if not options[kind]:
+                continue
+            try:
+                stats = importer.run(kind, read_rows(options[kind]))
+            except (OSError, KeyError, ValueError) as exc:
+                raise CommandError(f'{kind}: {exc!r}')
+            total += stats.rows
+            self.stdout.write(
+                f'{kind}: {stats.rows} строк за {stats.seconds:.1f} с '
+                f'({stats.rate:.0f} строк/с), пропущено {stats.skipped}'
+            )
+        if not options['skip_derived']:
+            derived_started = time.perf_counter()
+            refresh_derived()
+            self.stdout.write(
+                'Счётчики, ленты и поиск пересобраны за '
+                f'{time.perf_counter() - derived_started:.1f} с.'
+            )
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк за {seconds:.1f} с '
+            f'({total / seconds if seconds else 0:.0f} строк/с).'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = reconcile(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Счётчики пересчитаны для {total} авторов.')
+        )
@@ -0,0 +1,28 @@
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.models import StoredFile
+from core.storage import is_content_addressed
+
+from .models import Post
+
+
+def is_public(path):
+    """Можно ли отдать файл медиа: картинка поста или её миниатюра.
+
+    Закрытых постов в проекте нет, поэтому картинка видна, пока на неё
+    ссылается хоть один пост. Миниатюра видна, пока её помнит хранилище
+    ключей sorl: удаление картинки стирает оттуда и её миниатюры.
+    Файлы-сироты на диске не отдаются. Для имён по содержимому
+    хватает счётчика ссылок; старые имена и посты, записанные мимо
+    счётчика, ищутся по индексу на Post.image.
+    """
+    if path.startswith(settings.THUMBNAIL_PREFIX):
+        thumbnail = ImageFile(path, default.storage)
+        return default.kvstore.get(thumbnail) is not None
+    if is_content_addressed(path) and StoredFile.objects.filter(
+        name=path, references__gt=0
+    ).exists():
+        return True
+    return Post.objects.filter(image=path).exists()
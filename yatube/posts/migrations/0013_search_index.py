@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "text, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_comment_fts USING fts5("
+        "text, post_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_post_fts (rowid, text) '
+        'SELECT id, text FROM posts_post'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_comment_fts (rowid, text, post_id) '
+        'SELECT id, text, post_id FROM posts_comment'
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE posts_post_fts')
+    schema_editor.execute('DROP TABLE posts_comment_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
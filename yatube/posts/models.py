@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from . import thumbnails
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -14,6 +16,18 @@ class Group(models.Model):
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN."""
+        return self.select_related('author', 'group').defer(
+            'group__description',
+        )
+
+    def for_detail(self):
+        """Пост со статистикой автора; комментарии читаются страницами."""
+        return self.select_related('author', 'author__stats', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -23,6 +37,9 @@ class Post(models.Model):
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         auto_now_add=True)
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -42,13 +59,53 @@ class Post(models.Model):
         verbose_name='Картинка',
         upload_to='posts/',
         blank=True,
+        db_index=True,
         help_text="Поместите сюда картинку"
     )
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False)
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота картинки',
+        null=True,
+        blank=True,
+        editable=False)
+    image_placeholder = models.TextField(
+        verbose_name='Размытое превью картинки',
+        blank=True,
+        editable=False)
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    @property
+    def thumbnail_url(self):
+        return thumbnails.thumbnail_url(self.image.name)
+
+    @property
+    def thumbnail_size(self):
+        return thumbnails.thumbnail_size(self.image_width, self.image_height)
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -74,6 +131,13 @@ class Comment(models.Model):
         verbose_name='Дата отправки',
         auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -91,3 +155,65 @@ class Follow(models.Model):
         help_text="Автор",
         on_delete=models.CASCADE,
         related_name="following")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='follow_unique_user_author'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='timeline_user_pub_date_idx'),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique_user_post'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0)
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0)
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
@@ -0,0 +1,140 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Comment, Post
+
+POST_TABLE = 'posts_post_fts'
+COMMENT_TABLE = 'posts_comment_fts'
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5."""
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+
+def _replace(table, rowid, columns, values):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'VALUES (%s{", %s" * len(columns)})',
+            [rowid, *values],
+        )
+
+
+def _remove(table, rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [rowid])
+
+
+def index_post(post):
+    if is_supported():
+        _replace(POST_TABLE, post.pk, ['text'], [post.text])
+
+
+def remove_post(post_id):
+    if is_supported():
+        _remove(POST_TABLE, post_id)
+
+
+def index_comment(comment):
+    if is_supported():
+        _replace(
+            COMMENT_TABLE,
+            comment.pk,
+            ['text', 'post_id'],
+            [comment.text, comment.post_id],
+        )
+
+
+def remove_comment(comment_id):
+    if is_supported():
+        _remove(COMMENT_TABLE, comment_id)
+
+
+def rebuild():
+    """Заново строит полнотекстовый индекс по всем постам и комментариям."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {POST_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {POST_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+        cursor.execute(f'DELETE FROM {COMMENT_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, text, post_id) '
+            f'SELECT id, text, post_id FROM {Comment._meta.db_table}'
+        )
+
+
+class SearchResults:
+    """Ленивая выдача FTS5, которую можно отдать в Paginator."""
+
+    def __init__(self, expression):
+        self.expression = expression
+
+    def _matches_sql(self):
+        return (
+            f'SELECT rowid AS post_id, bm25({POST_TABLE}) AS score '
+            f'FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s '
+            f'UNION ALL '
+            f'SELECT post_id, bm25({COMMENT_TABLE}) * %s AS score '
+            f'FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s'
+        ), [
+            self.expression,
+            settings.SEARCH_COMMENT_WEIGHT,
+            self.expression,
+        ]
+
+    def count(self):
+        if not self.expression:
+            return 0
+        sql, params = self._matches_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM ({sql})', params
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.expression:
+            return []
+        offset = index.start or 0
+        limit = -1 if index.stop is None else index.stop - offset
+        sql, params = self._matches_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM ({sql}) GROUP BY post_id '
+                f'ORDER BY MIN(score), post_id DESC LIMIT %s OFFSET %s',
+                params + [limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def search_posts(query):
+    """Посты по запросу: ранжированные FTS5 или LIKE вне SQLite."""
+    if is_supported():
+        return SearchResults(match_expression(query))
+    if not query.strip():
+        return Post.objects.none()
+    return Post.objects.for_feed().filter(
+        Q(text__icontains=query) | Q(comments__text__icontains=query)
+    ).distinct()
@@ -0,0 +1,164 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import storage
+from core.tasks import release_key
+
+from . import (counters, feed_cache, follow_graph, search, tasks, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Поля автора, которые попадают в ленты и ответы API.
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def _post_scopes(author_id, *group_ids):
+    scopes = [feed_cache.INDEX_SCOPE, feed_cache.author_scope(author_id)]
+    scopes.extend(
+        feed_cache.group_scope(group_id)
+        for group_id in set(group_ids) if group_id is not None
+    )
+    return scopes
+
+
+def _invalidate_post(post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if row is not None:
+        feed_cache.bump(*_post_scopes(*row))
+
+
+def _image_in_use(name):
+    return Post.objects.filter(image=name).exists()
+
+
+def _delete_image(name):
+    # После коммита: к этому времени на файл мог сослаться другой пост.
+    if storage.delete_unreferenced(name, thumbnails.delete, _image_in_use):
+        release_key(tasks.THUMBNAILS_KEY.format(name))
+
+
+def _release_image(name):
+    if name and storage.release(name):
+        transaction.on_commit(lambda: _delete_image(name))
+
+
+@receiver(pre_save, sender=Post)
+def post_pre_save(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = ''
+    # Незакоммиченный файл хранилище сохранит и возьмёт на него ссылку.
+    instance._image_uploaded = bool(
+        instance.image and not instance.image._committed
+    )
+    if instance.pk is not None and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, '')
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_author(instance.author_id, 'posts_count', 1)
+        tasks.fan_out.delay(instance.pk)
+    # Ссылку на новую картинку берёт само хранилище при сохранении.
+    # Повторная загрузка тех же байтов даёт то же имя: у поста остаётся
+    # одна ссылка, поэтому лишнюю снимаем так же, как ссылку на старую.
+    previous_image = getattr(instance, '_previous_image', '')
+    if (
+        instance.image.name != previous_image
+        or getattr(instance, '_image_uploaded', False)
+    ):
+        _release_image(previous_image)
+    search.index_post(instance)
+    feed_cache.bump(*_post_scopes(
+        instance.author_id,
+        instance.group_id,
+        getattr(instance, '_previous_group_id', None),
+    ))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _release_image(instance.image.name)
+    counters.bump_author(instance.author_id, 'posts_count', -1)
+    search.remove_post(instance.pk)
+    feed_cache.bump(*_post_scopes(instance.author_id, instance.group_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+    search.index_comment(instance)
+    _invalidate_post(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    search.remove_comment(instance.pk)
+    _invalidate_post(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.bump(
+            feed_cache.INDEX_SCOPE,
+            feed_cache.GROUPS_SCOPE,
+            feed_cache.group_scope(instance.pk),
+        )
+
+
+@receiver(pre_save, sender=User)
+def author_pre_save(sender, instance, raw=False, **kwargs):
+    instance._previous_names = None
+    if instance.pk is not None and not raw:
+        instance._previous_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_names', None)
+    names = tuple(getattr(instance, field) for field in AUTHOR_FIELDS)
+    if not created and not raw and previous != names:
+        feed_cache.bump(feed_cache.AUTHORS_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follow_graph.invalidate(instance.user_id, instance.author_id)
+        counters.bump_author(instance.author_id, 'followers_count', 1)
+        counters.bump_author(instance.user_id, 'following_count', 1)
+        tasks.backfill.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follow_graph.invalidate(instance.user_id, instance.author_id)
+    counters.bump_author(instance.author_id, 'followers_count', -1)
+    counters.bump_author(instance.user_id, 'following_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    # Автор опустился ниже порога: его посты больше не подмешиваются
+    # при чтении, и их нужно разложить по лентам.
+    threshold = settings.TIMELINE_CELEBRITY_THRESHOLD
+    if timeline.followers_count(instance.author_id) == threshold - 1:
+        tasks.push_author.delay(instance.author_id)
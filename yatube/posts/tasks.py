@@ -0,0 +1,42 @@
+from core.tasks import task
+
+from . import follow_graph, thumbnails, timeline
+from .models import Post
+
+# Ключ идемпотентности генерации миниатюр одной картинки.
+THUMBNAILS_KEY = 'thumbnails:{}'
+
+
+@task
+def generate_thumbnails(image_name):
+    thumbnails.generate(image_name)
+
+
+@task
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task
+def backfill(user_id, author_id):
+    # Пока задача ждала в очереди, подписку могли уже отменить.
+    if follow_graph.is_following(user_id, author_id):
+        timeline.backfill(user_id, author_id)
+
+
+@task
+def push_author(author_id):
+    if not timeline.is_celebrity(author_id):
+        timeline.push_author(author_id)
+
+
+def schedule_thumbnails(post):
+    """Ставит генерацию миниатюр поста в очередь, по разу на картинку."""
+    if post.image:
+        generate_thumbnails.delay(
+            post.image.name, key=THUMBNAILS_KEY.format(post.image.name)
+        )
@@ -0,0 +1,51 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.feed_cache import AUTHORS_SCOPE, GROUPS_SCOPE, get_versions
+from posts.feed_items import FORMAT_VERSION, FeedItem
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_items.html'
+
+
+def card_key(post, groups_version, authors_version):
+    # FeedItem несёт обрезанный текст, поэтому его карточки не должны
+    # подменять карточки полного поста из подписок и поиска.
+    if isinstance(post, FeedItem):
+        representation = f'item{FORMAT_VERSION}'
+    else:
+        representation = 'post'
+    return 'post_card:{}:{}:{}:{}:{}:{}'.format(
+        representation,
+        post.pk,
+        post.updated.timestamp(),
+        post.comments_count,
+        groups_version,
+        authors_version,
+    )
+
+
+@register.filter
+def post_cards(posts):
+    """HTML карточек страницы ленты, прочитанный из кэша одним get_many."""
+    posts = list(posts)
+    if not posts:
+        return []
+    # Имя автора и ссылка на профиль лежат в карточке: переименование
+    # автора, как и группы, меняет ключи.
+    versions = get_versions((GROUPS_SCOPE, AUTHORS_SCOPE))
+    keys = [card_key(post, *versions) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            cards[key] = missing[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post}
+            )
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия'
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Тестовый пост'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_return_posts(self):
+        """Все ленты API отдают пост в JSON."""
+        urls = {
+            reverse('posts:api_index'): self.client,
+            reverse('posts:api_group_list', args=['test-slug']): self.client,
+            reverse('posts:api_profile', args=['auth']): self.client,
+            reverse('posts:api_follow_index'): self.reader_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(data['count'], 1)
+                post = data['results'][0]
+                self.assertEqual(post['text'], 'Тестовый пост')
+                self.assertEqual(post['author']['full_name'], 'Имя Фамилия')
+                self.assertEqual(post['group']['slug'], 'test-slug')
+
+    def test_not_modified_without_rendering(self):
+        """Повторный запрос с ETag получает 304 без SQL-запросов."""
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_etag_changes_with_posts_and_comments(self):
+        """Новый пост, комментарий и удаление меняют ETag."""
+        url = reverse('posts:api_post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments'][0]['text'], 'Комментарий')
+        index_url = reverse('posts:api_index')
+        etag = self.client.get(index_url)['ETag']
+        extra = Post.objects.create(author=self.reader, text='Ещё пост')
+        new_etag = self.client.get(index_url)['ETag']
+        self.assertNotEqual(etag, new_etag)
+        extra.delete()
+        self.assertNotEqual(self.client.get(index_url)['ETag'], new_etag)
+
+    def test_etag_changes_with_names(self):
+        """Переименование автора или группы меняет ETag."""
+        url = reverse('posts:api_post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.author.first_name = 'Другое'
+        self.author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['author']['full_name'], 'Другое Фамилия'
+        )
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['group']['title'], 'Новое название')
+
+    def test_etag_checks_use_indexed_lookups(self):
+        """ETag группы, профиля и поста — один запрос по ключу."""
+        urls = (
+            reverse('posts:api_group_list', args=['test-slug']),
+            reverse('posts:api_profile', args=['auth']),
+            reverse('posts:api_post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('WHERE', queries.captured_queries[0]['sql'])
+                self.assertNotIn('COUNT', queries.captured_queries[0]['sql'])
+
+    def test_follow_etag_changes_with_timeline(self):
+        """Новый пост автора из подписок меняет ETag ленты."""
+        url = reverse('posts:api_follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_follow_feed_is_private(self):
+        """Лента подписок не кешируется в общих кешах."""
+        url = reverse('posts:api_follow_index')
+        response = self.reader_client.get(url)
+        self.assertEqual(response['Cache-Control'], 'private')
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], 'private')
+        self.assertEqual(self.client.get(url).status_code, 302)
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import StoredFile
+from posts import benchmarks
+from posts.management.commands import benchmark_feeds
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class AuditIndexesCommandTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком."""
+        out = StringIO()
+        call_command('audit_indexes', stdout=out)
+        self.assertNotIn('FULL SCAN', out.getvalue())
+
+
+class BenchmarkTests(TestCase):
+    def test_benchmark_runs_on_seeded_data(self):
+        """Бенчмарк наполняет базу и отдаёт метрики по всем лентам."""
+        reader_id = benchmarks.seed(
+            users=5, groups=2, posts=20, comments=10, follows=6
+        )
+        results = benchmarks.run(reader_id, requests=2)
+        self.assertEqual(set(results), set(benchmarks.endpoints()))
+        for metrics in results.values():
+            self.assertEqual(metrics['status'], 200)
+            self.assertGreater(metrics['bytes'], 0)
+
+    def test_command_uses_private_cache(self):
+        """Прогон идёт на своём кеше и не трогает настроенный."""
+        cache.set('shared', 'value')
+        backends = []
+
+        def measure(command, volumes, options):
+            backends.append(caches['default'])
+            cache.clear()
+            return {}
+
+        with mock.patch.object(
+            benchmark_feeds.Command, 'measure', measure
+        ):
+            call_command('benchmark_feeds', stdout=StringIO())
+        self.assertIsInstance(backends[0], LocMemCache)
+        self.assertIsNot(backends[0], caches['default'])
+        self.assertEqual(cache.get('shared'), 'value')
+
+
+class ImportYatubeCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(content)
+        return path
+
+    def lines(self, rows):
+        return '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows)
+
+    def test_import_keeps_links_and_dates(self):
+        """Импорт связывает записи по id из файла и сохраняет даты."""
+        existing = User.objects.create_user(username='existing')
+        users = self.write('users.jsonl', self.lines([
+            {'id': 10, 'username': 'writer', 'first_name': 'Пишущий'},
+            {'id': 11, 'username': 'existing'},
+        ]))
+        groups = self.write(
+            'groups.csv',
+            'id,title,slug,description\n7,Группа,imported,Описание\n',
+        )
+        posts = self.write('posts.jsonl', self.lines([
+            {'id': 1, 'author': 10, 'group': 7, 'text': 'Старый пост',
+             'pub_date': '2015-05-01T10:00:00', 'image': 'posts/a.jpg'},
+            {'id': 2, 'author': 99, 'text': 'Без автора'},
+            {'id': 3, 'author': 10, 'text': 'Дубль', 'image': 'posts/a.jpg'},
+        ]))
+        comments = self.write(
+            'comments.csv',
+            'id,post,author,text,created\n'
+            '1,1,11,Комментарий,2015-05-02T10:00:00\n',
+        )
+        follows = self.write(
+            'follows.csv', 'user,author\n11,10\n11,10\n10,10\n'
+        )
+        out = StringIO()
+        call_command(
+            'import_yatube', users=users, groups=groups, posts=posts,
+            comments=comments, follows=follows, batch_size=1, stdout=out,
+        )
+        writer = User.objects.get(username='writer')
+        post = Post.objects.get(text='Старый пост')
+        self.assertEqual(User.objects.filter(username='existing').count(), 1)
+        self.assertEqual(post.author, writer)
+        self.assertEqual(post.group.slug, 'imported')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().author, existing)
+        self.assertFalse(Post.objects.filter(text='Без автора').exists())
+        self.assertEqual(
+            StoredFile.objects.get(name='posts/a.jpg').references, 2
+        )
+        self.assertEqual(Follow.objects.get().author, writer)
+        self.assertEqual(writer.stats.followers_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=existing, post=post).exists()
+        )
+        self.assertIn('строк/с', out.getvalue())
+        new_post = Post.objects.create(author=writer, text='Новый пост')
+        self.assertGreater(new_post.pk, post.pk)
+        self.assertEqual(new_post.pub_date.year, timezone.now().year)
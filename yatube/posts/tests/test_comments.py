@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for number in range(7):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.detail_url = reverse('posts:post_detail', args=[self.post.pk])
+        self.comments_url = reverse('posts:post_comments', args=[self.post.pk])
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_detail_shows_first_page(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.client.get(self.detail_url)
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'],
+        )
+        self.assertIsNotNone(response.context['comments_cursor'])
+
+    def test_cursor_walks_all_comments(self):
+        """Курсор проходит все комментарии без пропусков и повторов."""
+        cursor = self.client.get(self.detail_url).context['comments_cursor']
+        pages = []
+        while cursor:
+            data = self.client.get(
+                self.comments_url, {'cursor': cursor}
+            ).json()
+            pages.append(data['html'].count('media-body'))
+            cursor = data['next_cursor']
+        self.assertEqual(pages, [3, 1])
+
+    def test_detail_queries_do_not_grow(self):
+        """Число запросов страницы поста не зависит от числа комментариев."""
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(2):
+            self.client.get(self.detail_url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text='Ещё')
+            for _ in range(50)
+        )
+        with self.assertNumQueries(2):
+            self.client.get(self.detail_url)
+
+    def test_broken_cursor_and_missing_post(self):
+        """Битый курсор отдаёт первую страницу, чужой пост — 404."""
+        data = self.client.get(self.comments_url, {'cursor': 'xyz'}).json()
+        self.assertIn('Комментарий 0', data['html'])
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 100])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(COMMENT_THROTTLE_BURST=2, COMMENT_THROTTLE_RATE=0.01)
+class CommentWriteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.detail_url = reverse('posts:post_detail', args=[self.post.pk])
+        self.add_url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def test_detail_does_not_save_comments(self):
+        """POST на страницу поста не создаёт комментарий, форма пустая."""
+        response = Client().post(self.detail_url, {'text': 'Аноним'})
+        self.assertFalse(response.context['form'].is_bound)
+        self.client.post(self.detail_url, {'text': 'Мимо'})
+        self.assertFalse(Comment.objects.exists())
+
+    def test_comments_are_throttled(self):
+        """Сверх бакета комментарии отклоняются без записи в базу."""
+        for number in range(3):
+            response = self.client.post(
+                self.add_url, {'text': f'Комментарий {number}'}, follow=True
+            )
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertContains(response, 'Слишком много комментариев')
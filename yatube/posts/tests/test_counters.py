@@ -0,0 +1,78 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый заголовок',
+        )
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'},
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_profile_uses_counters(self):
+        """Профиль берёт количество постов из счётчика."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': 'author'})
+            )
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        self.assertEqual(response.context['post_count'], 1)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Comment.objects.create(post=self.post, author=self.reader, text='1')
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.all().update(posts_count=100, followers_count=7)
+        Post.objects.all().update(comments_count=42)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                image='posts/small.gif' if number == 0 else '',
+            )
+            for number in range(5)
+        ]
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.author, text='Свой комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse('posts:profile_export', args=['auth'])
+
+    def read_lines(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_jsonl_export_streams_posts_and_comments(self):
+        """JSON Lines отдаётся потоком и содержит только данные автора."""
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertIn('yatube-auth.jsonl', response['Content-Disposition'])
+        rows = self.read_lines(b''.join(response.streaming_content))
+        posts = [row for row in rows if row['type'] == 'post']
+        comments = [row for row in rows if row['type'] == 'comment']
+        self.assertEqual(
+            [row['text'] for row in posts],
+            [post.text for post in self.posts],
+        )
+        self.assertEqual(posts[0]['image_url'], '/media/posts/small.gif')
+        self.assertEqual(comments[0]['post'], self.posts[1].pk)
+
+    def test_zip_export(self):
+        """ZIP содержит отдельные файлы постов и комментариев."""
+        response = self.client.get(self.url, {'format': 'zip'})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertEqual(
+            archive.namelist(), ['posts.jsonl', 'comments.jsonl']
+        )
+        self.assertEqual(
+            len(self.read_lines(archive.read('posts.jsonl'))), 5
+        )
+
+    def test_only_author_can_export(self):
+        """Чужой архив скачать нельзя."""
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(self.url)
+        self.assertRedirects(
+            response, reverse('posts:profile', args=['auth'])
+        )
+
+    def test_export_command(self):
+        """Команда пишет ту же выгрузку в файл."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'auth.jsonl')
+        call_command(
+            'export_yatube', 'auth', output=path, stdout=io.StringIO()
+        )
+        with open(path, 'rb') as exported:
+            self.assertEqual(len(self.read_lines(exported.read())), 6)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.alice = User.objects.create_user(username='alice')
+        cls.bob = User.objects.create_user(username='bob')
+        cls.carol = User.objects.create_user(username='carol')
+
+    def setUp(self):
+        cache.clear()
+        Follow.objects.create(user=self.alice, author=self.bob)
+        Follow.objects.create(user=self.alice, author=self.carol)
+        Follow.objects.create(user=self.bob, author=self.alice)
+
+    def test_sets_are_sorted_and_cached(self):
+        """Подписки читаются из базы один раз и хранятся по порядку."""
+        expected = sorted([self.bob.pk, self.carol.pk])
+        self.assertEqual(
+            list(follow_graph.following_ids(self.alice.pk)), expected
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_graph.is_following(self.alice.pk, self.carol.pk)
+            )
+            self.assertFalse(
+                follow_graph.is_following(self.alice.pk, self.alice.pk)
+            )
+        self.assertEqual(
+            list(follow_graph.follower_ids(self.alice.pk)), [self.bob.pk]
+        )
+
+    def test_mutual(self):
+        """Взаимные подписки."""
+        self.assertEqual(follow_graph.mutual_ids(self.alice.pk), [self.bob.pk])
+        self.assertTrue(follow_graph.is_mutual(self.alice.pk, self.bob.pk))
+        self.assertFalse(follow_graph.is_mutual(self.alice.pk, self.carol.pk))
+        self.assertFalse(follow_graph.is_following(None, self.bob.pk))
+
+    def test_follow_and_unfollow_invalidate(self):
+        """Подписка и отписка сразу видны в кеше."""
+        self.assertFalse(follow_graph.is_following(self.carol.pk, self.bob.pk))
+        client = Client()
+        client.force_login(self.carol)
+        client.get(reverse('posts:profile_follow', args=['bob']))
+        self.assertTrue(follow_graph.is_following(self.carol.pk, self.bob.pk))
+        self.assertIn(self.carol.pk, follow_graph.follower_ids(self.bob.pk))
+        client.get(reverse('posts:profile_unfollow', args=['bob']))
+        self.assertFalse(follow_graph.is_following(self.carol.pk, self.bob.pk))
+        self.assertNotIn(self.carol.pk, follow_graph.follower_ids(self.bob.pk))
+
+    def test_stale_cache_does_not_skip_writes(self):
+        """Устаревший кеш графа не превращает подписку в пустую операцию."""
+        client = Client()
+        client.force_login(self.carol)
+        key = follow_graph.FOLLOWING_KEY.format(self.carol.pk)
+        cache.set(key, follow_graph._pack([self.bob.pk]))
+        client.get(reverse('posts:profile_follow', args=['bob']))
+        self.assertTrue(
+            Follow.objects.filter(user=self.carol, author=self.bob).exists()
+        )
+        cache.set(key, follow_graph._pack([]))
+        client.get(reverse('posts:profile_unfollow', args=['bob']))
+        self.assertFalse(
+            Follow.objects.filter(user=self.carol, author=self.bob).exists()
+        )
+
+    def test_profile_shows_follow_back(self):
+        """Профиль показывает, что автор подписан на читателя."""
+        client = Client()
+        client.force_login(self.alice)
+        response = client.get(reverse('posts:profile', args=['bob']))
+        self.assertTrue(response.context['following'])
+        self.assertTrue(response.context['follows_you'])
+        response = client.get(reverse('posts:profile', args=['carol']))
+        self.assertFalse(response.context['follows_you'])
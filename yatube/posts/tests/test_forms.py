@@ -1,13 +1,21 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO, StringIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
+from PIL import Image
 
+from core.models import StoredFile, Task
+from posts.feed_items import FeedItem
 from posts.models import Comment, Post
+from posts.tasks import THUMBNAILS_KEY
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -131,3 +139,158 @@ class PostFormTests(TestCase):
                 image=form_data['image']
             ).exists()
         )
+
+    def test_generate_thumbnails_command(self):
+        """Команда generate_thumbnails создаёт миниатюры заранее."""
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.assertTrue(
+            os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+        )
+
+
+def make_image(size, mode='RGB', fmt='PNG'):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIZE=(100, 100),
+    POST_IMAGE_MAX_UPLOAD_SIZE=20000,
+)
+class PostImagePipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, name, content):
+        return self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def test_image_is_reencoded_and_measured(self):
+        """Картинка ужимается, пережимается в JPEG и измеряется."""
+        self.create('photo.png', make_image((400, 200)))
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (100, 50))
+        self.assertEqual(post.thumbnail_size, (960, 339))
+
+    def test_transparent_image_stays_png(self):
+        """Картинка с прозрачностью сохраняется в PNG."""
+        self.create('logo.png', make_image((50, 50), mode='RGBA'))
+        self.assertTrue(Post.objects.get().image.name.endswith('.png'))
+
+    def test_oversized_upload_is_rejected(self):
+        """Файл больше лимита отклоняется с ошибкой поля."""
+        response = self.create('huge.bmp', make_image((200, 200), fmt='BMP'))
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 19,5\xa0КБ.'
+        )
+
+    def test_limit_counts_file_not_request_body(self):
+        """Лимит считает байты файла, а не всё тело запроса."""
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Текст ' * 5000,
+            'image': SimpleUploadedFile(
+                'small.png', make_image((10, 10)), content_type='image/png'
+            ),
+        })
+        self.assertTrue(Post.objects.get().image)
+
+    def test_feed_item_keeps_dimensions(self):
+        """Элемент ленты несёт размеры без обращения к файлу."""
+        self.create('photo.png', make_image((80, 40)))
+        item = FeedItem.from_tuple(
+            FeedItem.from_post(Post.objects.get()).to_tuple()
+        )
+        self.assertEqual((item.image_width, item.image_height), (80, 40))
+        self.assertEqual(item.thumbnail_size, (960, 339))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SharedImageTests(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='test_user')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост',
+            'image': SimpleUploadedFile(
+                'photo.png', make_image((40, 40))
+            ),
+        })
+        return Post.objects.latest('pk')
+
+    def test_duplicates_share_file_until_last_delete(self):
+        """Повторная загрузка не копирует файл, удаляется он последним."""
+        first, second = self.create(), self.create()
+        self.assertEqual(first.image.name, second.image.name)
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_same_bytes_reupload_keeps_one_reference(self):
+        """Правка с тем же файлом не оставляет лишней ссылки."""
+        post = self.create()
+        name = post.image.name
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {
+                'text': 'Пост',
+                'image': SimpleUploadedFile(
+                    'again.png', make_image((40, 40))
+                ),
+            },
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        stored = StoredFile.objects.get(name=name)
+        self.assertEqual(stored.references, 1)
+        path = post.image.path
+        post.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_file_kept_for_posts_outside_counter(self):
+        """Пост, записанный мимо счётчика, удерживает общий файл."""
+        post = self.create()
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Импорт', image=post.image.name)
+        ])
+        path = post.image.path
+        post.delete()
+        self.assertTrue(os.path.exists(path))
+
+    @override_settings(TASKS_EAGER=False)
+    def test_reupload_after_delete_schedules_thumbnails(self):
+        """После удаления файла повторная загрузка снова ставит миниатюры."""
+        post = self.create()
+        key = THUMBNAILS_KEY.format(post.image.name)
+        self.assertTrue(Task.objects.filter(key=key).exists())
+        post.delete()
+        self.assertFalse(Task.objects.filter(key=key).exists())
+        post = self.create()
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertTrue(Task.objects.filter(key=key).exists())
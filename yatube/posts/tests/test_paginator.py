@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Group, Post
@@ -46,3 +48,41 @@ class PaginatorViewsTest(TestCase):
                 with self.subTest(page=page):
                     response = self.authorized_client.get(page + postsurls)
                     self.assertEqual(len(response.context['page_obj']), posts)
+
+    def test_cursor_paginator(self):
+        '''Курсорная пагинация обходит ленту без COUNT и OFFSET'''
+        for post in range(11):
+            Post.objects.create(
+                text=f'Тестовый текст {post}',
+                author=self.user,
+                group=self.group,
+            )
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        response = self.authorized_client.get(url)
+        first_page = list(response.context['page_obj'])
+        next_cursor = response.context['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                url, {'cursor': next_cursor}
+            )
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        second_page = list(response.context['page_obj'])
+        self.assertEqual(
+            len(second_page), Post.objects.count() % settings.AMOUNT_POSTS
+        )
+        self.assertFalse(set(first_page) & set(second_page))
+        self.assertIsNone(response.context['next_cursor'])
+        response = self.authorized_client.get(
+            url, {'cursor': response.context['previous_cursor']}
+        )
+        self.assertEqual(list(response.context['page_obj']), first_page)
+
+    def test_broken_cursor_falls_back_to_page(self):
+        '''Битый курсор открывает первую страницу'''
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
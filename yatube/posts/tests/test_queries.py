@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TransactionTestCase):
+    def setUp(self):
+        self.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовый текст',
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(
+                username=f'author_{number}',
+                first_name='Имя',
+                last_name=f'Фамилия {number}',
+            )
+            for number in range(3)
+        ]
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+            for number in range(5):
+                Post.objects.create(
+                    author=author,
+                    group=self.group,
+                    text=f'Тестовый пост {number}',
+                )
+        self.post = Post.objects.filter(author=self.authors[0]).first()
+        for author in self.authors:
+            Comment.objects.create(
+                post=self.post, author=author, text='Комментарий'
+            )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def test_feed_query_count(self):
+        """Число запросов на страницу не зависит от числа постов."""
+        pages = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): 5,
+            reverse(
+                'posts:profile', kwargs={'username': 'author_0'}
+            ): 5,
+            # Плюс запрос знаменитостей, чьи посты подмешиваются при чтении.
+            reverse('posts:follow_index'): 5,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): 4,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.authorized_client.get(url)
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post_in_text = Post.objects.create(
+            author=cls.user,
+            text='Жираф пришёл в гости',
+        )
+        cls.post_in_comment = Post.objects.create(
+            author=cls.user,
+            text='Пост без ключевого слова',
+        )
+        Comment.objects.create(
+            post=cls.post_in_comment,
+            author=cls.user,
+            text='А где жираф?',
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.user,
+            text='Совсем другая история',
+        )
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_search_ranks_text_above_comments(self):
+        """Поиск находит посты по тексту и комментариям, текст выше."""
+        response = self.search('жираф')
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.post_in_text, self.post_in_comment],
+        )
+
+    def test_search_follows_edits_and_deletes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        other_post = Post.objects.get(id=self.other_post.id)
+        other_post.text = 'Жираф тоже здесь'
+        other_post.save()
+        self.assertIn(other_post, self.search('жираф').context['page_obj'])
+        Post.objects.get(id=self.post_in_text.id).delete()
+        self.assertNotIn(
+            self.post_in_text, self.search('жираф').context['page_obj']
+        )
+
+    def test_search_ignores_query_syntax(self):
+        """Спецсимволы FTS в запросе не ломают поиск."""
+        for query in ('"жираф', 'жираф AND OR (', '*', ''):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+
+    def test_search_pagination_keeps_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос."""
+        for number in range(settings.AMOUNT_POSTS):
+            Post.objects.create(author=self.user, text=f'Жираф {number}')
+        response = self.search('жираф')
+        self.assertContains(
+            response, '?q=%D0%B6%D0%B8%D1%80%D0%B0%D1%84&amp;page=2'
+        )
+        response = self.search('жираф', page=2)
+        self.assertEqual(len(response.context['page_obj']), 2)
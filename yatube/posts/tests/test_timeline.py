@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import profiling
+from posts.models import Follow, Post, TimelineEntry
+from posts.timeline import get_timeline
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_CELEBRITY_THRESHOLD=2, AMOUNT_POSTS=3)
+class HybridTimelineTests(TransactionTestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader')
+        self.fan = User.objects.create_user(username='fan')
+        self.star = User.objects.create_user(username='star')
+        self.author = User.objects.create_user(username='author')
+        cache.clear()
+        profiling.reset()
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.fan, author=self.star)
+        self.posts = [
+            Post.objects.create(
+                author=self.star if number % 2 else self.author,
+                text=f'Пост {number}',
+            )
+            for number in range(6)
+        ]
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def texts(self, page):
+        return [post.text for post in page]
+
+    def test_celebrity_posts_are_not_pushed(self):
+        """Посты знаменитости не пишутся в ленты подписчиков."""
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.star).exists()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(author=self.author).count(), 3
+        )
+        summary = profiling.snapshot()['timeline']
+        self.assertEqual(summary['push_rows']['count'], 6)
+
+    def test_feed_merges_inbox_and_pulled(self):
+        """Лента сливает инбокс и посты знаменитости по дате."""
+        response = self.client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(type(page_obj), Page)
+        self.assertEqual(page_obj.paginator.count, 6)
+        self.assertEqual(self.texts(page_obj), ['Пост 5', 'Пост 4', 'Пост 3'])
+        response = self.client.get(
+            reverse('posts:follow_index'), {'page': 2}
+        )
+        self.assertEqual(
+            self.texts(response.context['page_obj']),
+            ['Пост 2', 'Пост 1', 'Пост 0'],
+        )
+        self.assertIn('merge_ms', profiling.snapshot()['timeline'])
+
+    def test_deep_pages_match_full_order(self):
+        """Далёкие страницы идут в общем порядке и не читают всё до них."""
+        for number in range(6, 20):
+            Post.objects.create(
+                author=self.star if number % 3 else self.author,
+                text=f'Пост {number}',
+            )
+        expected = self.texts(Post.objects.order_by('-pub_date', '-pk'))
+        feed = get_timeline(self.reader)
+        pages = [feed[start:start + 3] for start in range(0, 20, 3)]
+        self.assertEqual(
+            [text for page in pages for text in self.texts(page)], expected
+        )
+        with CaptureQueriesContext(connection) as queries:
+            feed[18:20]
+        self.assertLessEqual(len(queries), 2 * 5 + 2)
+
+    def test_cursor_pages(self):
+        """Курсор по слитой ленте идёт без пропусков и повторов."""
+        response = self.client.get(reverse('posts:follow_index'))
+        cursor = response.context['next_cursor']
+        response = self.client.get(
+            reverse('posts:follow_index'), {'cursor': cursor}
+        )
+        self.assertEqual(
+            self.texts(response.context['page_obj']),
+            ['Пост 2', 'Пост 1', 'Пост 0'],
+        )
+
+    def test_demoted_author_is_pushed(self):
+        """Автор ниже порога снова раскладывается по лентам."""
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=self.reader, author=self.star
+            ).count(),
+            3,
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['paginator'].count, 6)
@@ -1,11 +1,19 @@
+import pickle
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 
-from posts.models import Comment, Follow, Group, Post
+from posts import feed_items
+from posts.feed_cache import (AUTHORS_SCOPE, GROUPS_SCOPE, LOCK_SUFFIX,
+                              PAGE_KEY, get_versions)
+from posts.feed_items import FeedItem
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.templatetags.post_cards import card_key
 
 User = get_user_model()
 
@@ -79,18 +87,118 @@ class PostViewTests(TestCase):
         response_first = self.authorized_client.get(
             reverse('posts:index')
         )
+        Post.objects.filter(id=self.post.id).update(
+            text='Измененный без сигналов заголовок'
+        )
+        response_second = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        self.assertEqual(response_first.content, response_second.content)
         first_object = Post.objects.get(id=self.post.id)
         first_object.text = 'Измененный заголовок'
         first_object.save()
+        response_third = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        self.assertNotEqual(response_first.content, response_third.content)
+        self.assertContains(response_third, 'Измененный заголовок')
+
+    def test_cache_index_serves_stale_page_while_locked(self):
+        """Пока страница пересчитывается, отдаётся предыдущая копия"""
+        cache.clear()
+        response_first = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        lock_key = PAGE_KEY.format(
+            'index|groups|authors', 'page:1'
+        ) + LOCK_SUFFIX
+        cache.add(lock_key, 1)
+        Post.objects.create(author=self.user, text='Свежий пост')
         response_second = self.authorized_client.get(
             reverse('posts:index')
         )
         self.assertEqual(response_first.content, response_second.content)
-        cache.clear()
+        cache.delete(lock_key)
         response_third = self.authorized_client.get(
             reverse('posts:index')
         )
-        self.assertNotEqual(response_first.content, response_third.content)
+        self.assertContains(response_third, 'Свежий пост')
+
+    def test_post_cards_cached(self):
+        """Карточки постов берутся из кэша фрагментов"""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        versions = get_versions((GROUPS_SCOPE, AUTHORS_SCOPE))
+        post = Post.objects.get(id=self.post.id)
+        self.assertIsNotNone(cache.get(
+            card_key(FeedItem.from_post(post), *versions)
+        ))
+        self.assertIsNone(cache.get(card_key(post, *versions)))
+        Post.objects.filter(id=self.post_none_group.id).update(
+            text='Текст без сигналов'
+        )
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        self.assertNotContains(response, 'Текст без сигналов')
+        post = Post.objects.get(id=self.post_none_group.id)
+        post.save()
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        self.assertContains(response, 'Текст без сигналов')
+
+    def test_author_rename_refreshes_feeds(self):
+        """Новое имя автора сразу видно в закешированных лентах"""
+        cache.clear()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        author = User.objects.get(pk=self.user.pk)
+        author.username = 'renamed'
+        author.save()
+        urls += (reverse('posts:profile', kwargs={'username': 'renamed'}),)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, '/profile/renamed/')
+                self.assertNotContains(response, '/profile/test_user/')
+
+    @override_settings(FEED_TEXT_LENGTH=10)
+    def test_truncated_card_not_shared_with_full_post(self):
+        """Обрезанная карточка ленты не попадает в поиск"""
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.post.text)
+        response = self.authorized_client.get(
+            reverse('posts:search'), {'q': 'Тестовый'}
+        )
+        self.assertContains(response, self.post.text)
+
+    def test_feed_cache_stores_compact_items(self):
+        """В кэш лент попадают упакованные элементы, а не модели"""
+        cache.clear()
+        response = self.authorized_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
+        item = response.context['page_obj'][0]
+        self.assertIsInstance(item, FeedItem)
+        self.assertEqual(item.author.username, self.user.username)
+        self.assertEqual(item.group.slug, self.group.slug)
+        self.assertEqual(item.pub_date, self.post.pub_date)
+        self.assertEqual(item.image, self.post.image.name)
+        self.assertTrue(item.thumbnail_url.startswith('/media/cache/'))
+        key = PAGE_KEY.format(f'group:{self.group.pk}|authors', 'page:1')
+        payload = cache.get(key)[2]
+        self.assertIsInstance(payload[1], bytes)
+        self.assertEqual(feed_items.loads(payload[1]), [item])
+        self.assertLess(
+            len(payload[1]),
+            len(pickle.dumps(list(Post.objects.for_feed()))) / 3,
+        )
 
     def test_index_context(self):
         """Шаблон index сформирован с правильным контекстом."""
@@ -194,25 +302,23 @@ class PostViewTests(TestCase):
         )
 
 
-class FollowerViewTests(TestCase):
-    @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        cls.follower = User.objects.create_user(username='follower')
-        cls.un_follower = User.objects.create_user(username='un_Follower')
-        cls.author = User.objects.create_user(username='author')
-        cls.post = Post.objects.create(
-            author=cls.author,
+class FollowerViewTests(TransactionTestCase):
+    def setUp(self):
+        self.follower = User.objects.create_user(username='follower')
+        self.un_follower = User.objects.create_user(username='un_Follower')
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            author=self.author,
             text='Тестовый заголовок автора',
         )
-        cls.anoter_post = Post.objects.create(
-            author=cls.un_follower,
+        self.anoter_post = Post.objects.create(
+            author=self.un_follower,
             text='Тестовый заголовок',
         )
-        cls.authorized_client = Client()
-        cls.authorized_client.force_login(cls.follower)
-        cls.authorized_un_follower = Client()
-        cls.authorized_un_follower.force_login(cls.un_follower)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+        self.authorized_un_follower = Client()
+        self.authorized_un_follower.force_login(self.un_follower)
         cache.clear()
 
     def test_follow(self):
@@ -260,3 +366,27 @@ class FollowerViewTests(TestCase):
         self.assertNotContains(
             response, self.post.text or self.anoter_post.text
         )
+
+    def test_timeline_fan_out_and_prune(self):
+        """Лента подписок материализуется при публикации и отписке"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=self.post
+        ).exists())
+        new_post = Post.objects.create(
+            author=self.author,
+            text='Новый пост автора',
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=new_post
+        ).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.un_follower
+        ).exists())
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.author.username}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.follower
+        ).exists())
@@ -0,0 +1,65 @@
+import logging
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+
+def generate(image_name):
+    """Создаёт все размеры миниатюр и кладёт их в хранилище sorl."""
+    for geometry, options in settings.POST_THUMBNAIL_SIZES:
+        get_thumbnail(image_name, geometry, **options)
+
+
+def thumbnail_url(image_name):
+    """URL миниатюры для лент или None, если картинки нет."""
+    if not image_name:
+        return None
+    geometry, options = settings.POST_THUMBNAIL_SIZES[0]
+    try:
+        return get_thumbnail(image_name, geometry, **options).url
+    except Exception:
+        logger.exception('Не удалось получить миниатюру %s', image_name)
+        return None
+
+
+def thumbnail_size(width, height):
+    """Размер миниатюры для лент по размеру оригинала, без чтения файла.
+
+    Повторяет расчёт sorl: с crop миниатюра ровно по геометрии,
+    без него — вписывается в неё с сохранением пропорций.
+    """
+    if not width or not height:
+        return None
+    geometry, options = settings.POST_THUMBNAIL_SIZES[0]
+    box_width, box_height = (int(part) for part in geometry.split('x'))
+    if options.get('crop'):
+        if options.get('upscale') or (
+            width >= box_width and height >= box_height
+        ):
+            return box_width, box_height
+        return min(width, box_width), min(height, box_height)
+    ratio = min(box_width / width, box_height / height)
+    if not options.get('upscale'):
+        ratio = min(ratio, 1)
+    return round(width * ratio), round(height * ratio)
+
+
+def delete(image_name):
+    """Удаляет картинку и её миниатюры; ссылки проверяет вызывающий."""
+    try:
+        delete_with_thumbnails(image_name)
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', image_name)
+
+
+def generate_in_worker(image_name):
+    try:
+        generate(image_name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image_name)
+    finally:
+        connection.close()
@@ -0,0 +1,239 @@
+import time
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+
+from core import profiling
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+# Имя группы гистограмм в core.profiling: по ним подбирают порог.
+METRICS_NAME = 'timeline'
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def followers_count(author_id):
+    return AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def is_celebrity(author_id):
+    """Посты автора с порогом подписчиков читаются при показе ленты."""
+    return (
+        followers_count(author_id)
+        >= settings.TIMELINE_CELEBRITY_THRESHOLD
+    )
+
+
+def celebrity_ids(user=None):
+    """Id знаменитостей: все или только те, на кого подписан user."""
+    stats = AuthorStats.objects.filter(
+        followers_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD
+    )
+    if user is not None:
+        stats = stats.filter(user_id__in=Follow.objects.filter(
+            user=user
+        ).values('author_id'))
+    return stats.values_list('user_id', flat=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора.
+
+    Посты знаменитостей не раскладываются: их подмешивает get_timeline.
+    """
+    started = time.perf_counter()
+    pushed = 0
+    if not is_celebrity(post.author_id):
+        followers = Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True).iterator()
+        batch = []
+        for user_id in followers:
+            batch.append(TimelineEntry(
+                user_id=user_id,
+                author_id=post.author_id,
+                post_id=post.pk,
+                pub_date=post.pub_date,
+            ))
+            if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+                _bulk_insert(batch)
+                pushed += len(batch)
+                batch = []
+        if batch:
+            _bulk_insert(batch)
+            pushed += len(batch)
+    # fan_out выполняется в воркере: замеры уходят в общий кеш.
+    profiling.observe_shared(METRICS_NAME, 'push_rows', pushed)
+    profiling.observe_shared(METRICS_NAME, 'push_ms', _elapsed_ms(started))
+
+
+def _push_author_posts(user_id, author_id):
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date').iterator()
+    batch = []
+    for post_id, pub_date in posts:
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            author_id=author_id,
+            post_id=post_id,
+            pub_date=pub_date,
+        ))
+        if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if not is_celebrity(author_id):
+        _push_author_posts(user_id, author_id)
+
+
+def push_author(author_id):
+    """Раскладывает все посты автора, который перестал быть знаменитостью.
+
+    Пока он был выше порога, его новые посты в ленты не попадали.
+    """
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator()
+    for user_id in followers:
+        _push_author_posts(user_id, author_id)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class FollowFeed:
+    """Лента подписок: инбокс из TimelineEntry и посты знаменитостей.
+
+    Обе выборки отсортированы по (pub_date, id), страница собирается
+    слиянием через heapq.merge. Объект умеет count(), срезы, filter()
+    и order_by() — этого хватает Paginator и keyset-курсору.
+    """
+
+    ordered = True
+
+    def __init__(self, inbox, pulled=None, descending=True):
+        self.inbox = inbox
+        self.pulled = pulled
+        self.descending = descending
+
+    def _clone(self, method, *args, **kwargs):
+        return FollowFeed(
+            getattr(self.inbox, method)(*args, **kwargs),
+            None if self.pulled is None
+            else getattr(self.pulled, method)(*args, **kwargs),
+            self.descending,
+        )
+
+    def filter(self, *args, **kwargs):
+        return self._clone('filter', *args, **kwargs)
+
+    def order_by(self, *fields):
+        feed = self._clone('order_by', *fields)
+        feed.descending = fields[0].startswith('-')
+        return feed
+
+    def count(self):
+        total = self.inbox.count()
+        if self.pulled is not None:
+            total += self.pulled.count()
+        return total
+
+    def __len__(self):
+        return self.count()
+
+    def _before(self, first, second):
+        return first > second if self.descending else first < second
+
+    def _split(self, offset):
+        """Сколько из первых offset элементов ленты лежит в инбоксе.
+
+        Бинарный поиск по ключам (pub_date, id): каждая проба читает
+        по одной строке с каждой стороны, а не всё до offset.
+        """
+        def key(queryset, index):
+            rows = list(
+                queryset.values_list('pub_date', 'pk')[index:index + 1]
+            )
+            return rows[0] if rows else None
+
+        low, high = 0, offset
+        while low < high:
+            taken = (low + high) // 2
+            pulled_last = key(self.pulled, offset - taken - 1)
+            inbox_next = key(self.inbox, taken)
+            if inbox_next is not None and (
+                pulled_last is None or self._before(inbox_next, pulled_last)
+            ):
+                low = taken + 1
+            else:
+                high = taken
+        return low
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if self.pulled is None:
+            return list(self.inbox[key])
+        started = time.perf_counter()
+        start, stop = key.start or 0, key.stop
+        from_inbox = self._split(start) if start else 0
+        from_pulled = start - from_inbox
+        limit = stop - start
+        merged = merge(
+            self.inbox[from_inbox:from_inbox + limit],
+            self.pulled[from_pulled:from_pulled + limit],
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=self.descending,
+        )
+        page = list(islice(merged, limit))
+        profiling.observe(METRICS_NAME, 'merge_ms', _elapsed_ms(started))
+        return page
+
+
+def get_timeline(user):
+    """Лента подписок: push-инбокс плюс pull постов знаменитостей."""
+    celebrities = list(celebrity_ids(user))
+    profiling.observe(METRICS_NAME, 'pull_authors', len(celebrities))
+    inbox = Post.objects.for_feed().filter(
+        timeline_entries__user=user
+    ).order_by('-timeline_entries__pub_date', '-pk')
+    if not celebrities:
+        return FollowFeed(inbox)
+    return FollowFeed(
+        inbox.exclude(author_id__in=celebrities),
+        Post.objects.for_feed().filter(
+            author_id__in=celebrities
+        ).order_by('-pub_date', '-pk'),
+    )
+
+
+def rebuild():
+    """Пересобирает ленты всех пользователей по текущим подпискам."""
+    TimelineEntry.objects.all().delete()
+    celebrities = set(celebrity_ids())
+    follows = Follow.objects.values_list('user_id', 'author_id').iterator()
+    for user_id, author_id in follows:
+        if author_id not in celebrities:
+            _push_author_posts(user_id, author_id)
@@ -1,8 +1,6 @@
-from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -19,19 +17,34 @@ urlpatterns = [
         name='profile_unfollow'
     ),
 
+    path(
+        'profile/<str:username>/export/',
+        views.profile_export,
+        name='profile_export'
+    ),
+
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
+    path('search/', views.search, name='search'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path(
+        'api/profile/<str:username>/',
+        api.profile,
+        name='api_profile'
+    ),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
     path('', views.index, name='index')
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
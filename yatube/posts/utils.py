@@ -1,13 +1,145 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_token(*parts):
+    """Упаковывает части позиции в непрозрачный токен для URL."""
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Части позиции из токена или None, если токен не декодируется."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        return base64.urlsafe_b64decode(token + padding).decode().split('|')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def encode_cursor(direction, obj):
+    """Упаковывает позицию (pub_date, id) в непрозрачный токен."""
+    return encode_token(direction, obj.pub_date.isoformat(), obj.pk)
+
+
+def decode_cursor(token):
+    """Возвращает (direction, pub_date, id) или None для битого токена."""
+    parts = decode_token(token)
+    try:
+        direction, pub_date, pk = parts
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница keyset-пагинации: без COUNT(*) и без OFFSET."""
+
+    paginator = None
+    number = None
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def get_cursor_page(queryset, cursor, per_page):
+    """Выбирает per_page + 1 записей по ключу (pub_date, id)."""
+    direction, pub_date, pk = cursor
+    if direction == CURSOR_NEXT:
+        rows = list(queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        ).order_by('-pub_date', '-pk')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = (
+            encode_cursor(CURSOR_NEXT, rows[-1]) if has_more else None
+        )
+        previous_cursor = (
+            encode_cursor(CURSOR_PREVIOUS, rows[0]) if rows else None
+        )
+    else:
+        rows = list(queryset.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).order_by('pub_date', 'pk')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        previous_cursor = (
+            encode_cursor(CURSOR_PREVIOUS, rows[0]) if has_more else None
+        )
+        next_cursor = encode_cursor(CURSOR_NEXT, rows[-1]) if rows else None
+    return CursorPage(rows, next_cursor, previous_cursor)
+
+
+def pagination_query(request):
+    """GET-параметры запроса без page и cursor — для ссылок пагинатора."""
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
+    return query.urlencode() + '&' if query else ''
 
 
-def get_paginator(list, request):
+def get_paginator(list, request, count=None):
+    supports_cursor = hasattr(list, 'filter')
+    cursor = decode_cursor(request.GET.get('cursor', ''))
+    if cursor is not None and supports_cursor:
+        page_obj = get_cursor_page(list, cursor, settings.AMOUNT_POSTS)
+        return {
+            'paginator': None,
+            'page_number': None,
+            'page_obj': page_obj,
+            'next_cursor': page_obj.next_cursor,
+            'previous_cursor': page_obj.previous_cursor,
+            'pagination_query': pagination_query(request),
+        }
     paginator = Paginator(list, settings.AMOUNT_POSTS)
+    if count is not None:
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return {
         'paginator': paginator,
         'page_number': page_number,
         'page_obj': page_obj,
+        'next_cursor': (
+            encode_cursor(CURSOR_NEXT, page_obj[-1])
+            if supports_cursor and page_obj.has_next() else None
+        ),
+        'previous_cursor': (
+            encode_cursor(CURSOR_PREVIOUS, page_obj[0])
+            if supports_cursor and page_obj.has_previous() else None
+        ),
+        'pagination_query': pagination_query(request),
     }
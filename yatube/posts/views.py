@@ -1,21 +1,34 @@
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
 
+from core.ratelimit import take_token
+
+from . import export, follow_graph, tasks
+from .comments import decode_comment_cursor, get_comment_page
+from .counters import author_stats
+from .feed_cache import (AUTHORS_SCOPE, GROUPS_SCOPE, INDEX_SCOPE,
+                         author_scope, get_cached_paginator, group_scope)
 from .forms import CommentForm, PostForm
+from .images import limit_image_uploads
 from .models import Follow, Group, Post
+from .search import search_posts
+from .timeline import get_timeline
 from .utils import get_paginator
 
 User = get_user_model()
 
 
-@cache_page(60 * 15, key_prefix='index_page')
 def index(request):
-    context = get_paginator(
-        Post.objects.select_related('group').all(),
-        request
+    context = get_cached_paginator(
+        Post.objects.for_feed(),
+        request,
+        (INDEX_SCOPE, GROUPS_SCOPE, AUTHORS_SCOPE),
     )
     return render(request, 'posts/index.html', context)
 
@@ -25,50 +38,79 @@ def group_posts(request, slug):
     context = {
         'group': group,
     }
-    context.update(get_paginator(group.posts.all(), request))
+    context.update(get_cached_paginator(
+        group.posts.for_feed(),
+        request,
+        (group_scope(group.pk), AUTHORS_SCOPE),
+    ))
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    user_posts = author.posts.all()
-    post_count = user_posts.count()
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author
-        ).exists()
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    user_posts = author.posts.for_feed()
+    stats = author_stats(author)
+    following, follows_you = follow_graph.relation(
+        request.user.pk, author.pk
+    )
     context = {
         'following': following,
+        'follows_you': follows_you,
         'author': author,
-        'post_count': post_count,
+        'post_count': stats.posts_count,
+        'stats': stats,
     }
-    context.update(get_paginator(user_posts, request))
+    context.update(get_cached_paginator(
+        user_posts,
+        request,
+        (author_scope(author.pk), GROUPS_SCOPE, AUTHORS_SCOPE),
+        count=stats.posts_count,
+    ))
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    post_count = post.author.posts.count()
-    form = CommentForm(request.POST)
-    comments = post.comments.all()
-    if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
-        return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    post_count = author_stats(post.author).posts_count
+    comments, comments_cursor = get_comment_page(
+        post.pk, decode_comment_cursor(request.GET.get('comments'))
+    )
     context = {
-        'form': form,
+        'form': CommentForm(),
         'post': post,
         'post_count': post_count,
-        'comments': comments
+        'comments': comments,
+        'comments_cursor': comments_cursor,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев HTML-фрагментом в JSON."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments, next_cursor = get_comment_page(
+        post_id, decode_comment_cursor(request.GET.get('cursor'))
+    )
+    return JsonResponse({
+        'html': render_to_string(
+            'posts/includes/comments.html', {'comments': comments}, request
+        ),
+        'next_cursor': next_cursor,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '')
+    context = {'query': query}
+    context.update(get_paginator(search_posts(query), request))
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@limit_image_uploads
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -77,11 +119,13 @@ def post_create(request):
         form = form.save(commit=False)
         form.author = request.user
         form.save()
+        tasks.schedule_thumbnails(form)
         return redirect('posts:profile', request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
+@limit_image_uploads
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, pk=post_id)
@@ -94,6 +138,8 @@ def post_edit(request, post_id):
     if request.method == "POST":
         if form.is_valid():
             form.save()
+            if 'image' in form.changed_data:
+                tasks.schedule_thumbnails(post)
             return redirect('posts:post_detail', post_id=post.pk)
     context = {
         'form': form,
@@ -105,6 +151,14 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
+    if request.method == 'POST' and not take_token(
+        'comment',
+        request.user.pk,
+        settings.COMMENT_THROTTLE_RATE,
+        settings.COMMENT_THROTTLE_BURST,
+    ):
+        messages.error(request, 'Слишком много комментариев, подождите.')
+        return redirect('posts:post_detail', post_id=post_id)
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -117,7 +171,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    list_of_posts = Post.objects.filter(author__following__user=request.user)
+    list_of_posts = get_timeline(request.user)
     context = get_paginator(list_of_posts, request)
     return render(request, 'posts/follow.html', context)
 
@@ -126,6 +180,7 @@ def follow_index(request):
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
+    # Запись идёт всегда: кеш графа мог отстать, а сигналы его обновят.
     if user != author:
         Follow.objects.get_or_create(user=user, author=author)
     return redirect(reverse('posts:profile', args={username}))
@@ -134,11 +189,28 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follower = Follow.objects.filter(user=request.user, author=author)
-    follower.delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=author)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    export_format = request.GET.get('format')
+    if export_format not in export.FORMATS:
+        export_format = export.JSONL
+    response = StreamingHttpResponse(
+        export.export_chunks(author, export_format),
+        content_type=export.CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(author, export_format)}"'
+    )
+    return response
+
+
 def page_not_found(request, exception):
     return render(
         request,
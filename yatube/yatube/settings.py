@@ -40,6 +40,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +56,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,6 +80,25 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи браузер читает только основную базу.
+REPLICA_STICKY_SECONDS = 10
+
+REPLICA_STICKY_COOKIE = 'use_primary'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -121,6 +142,29 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки называются по хешу содержимого; миниатюрам sorl это не нужно.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+THUMBNAIL_PREFIX = 'cache/'
+
+# Кто отдаёт медиа: 'django' — поток из воркера с Range, 'x-accel' —
+# nginx по X-Accel-Redirect, 'x-sendfile' — Apache или lighttpd.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+
+# internal-location nginx, смотрящий в MEDIA_ROOT.
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+MEDIA_SERVE_PREFIXES = ('posts/', THUMBNAIL_PREFIX)
+
+# Файл отдаётся, только если эта функция признаёт его по пути.
+MEDIA_ACCESS_CHECK = 'posts.media.is_public'
+
+# Имена картинок и миниатюр зависят от содержимого и не перезаписываются.
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Картинки со старыми именами (до хеширования) могут смениться или уйти.
+MEDIA_LEGACY_CACHE_MAX_AGE = 60 * 60
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
@@ -128,3 +172,95 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Общий кеш для нескольких процессов: redis://host:port/db.
+CACHE_URL = os.environ.get('CACHE_URL')
+if CACHE_URL:
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.backend.TwoTierCache',
+        'LOCATION': CACHE_URL,
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'SOCKET_TIMEOUT': 1,
+        },
+    }
+
+TIMELINE_BATCH_SIZE = 500
+
+# С этого числа подписчиков посты автора не раскладываются по лентам
+# при публикации, а подмешиваются при чтении. Подбирается по гистограммам
+# timeline в admin/profiling/.
+TIMELINE_CELEBRITY_THRESHOLD = 10000
+
+FEED_CACHE_TIMEOUT = 60 * 15
+
+FEED_CACHE_STALE_TIMEOUT = 60
+
+FEED_CACHE_LOCK_TIMEOUT = 10
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+POST_THUMBNAIL_SIZES = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Предел для картинки поста. Создание и правка поста ставят
+# posts.images.LimitedUploadHandler первым: файл больше лимита не пишется
+# на диск и не открывается Pillow.
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Защита от «бомб»: столько пикселей Pillow готов распаковать.
+POST_IMAGE_MAX_PIXELS = 40_000_000
+
+# Картинки ужимаются до этих сторон и пережимаются в JPEG или PNG.
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+
+POST_IMAGE_QUALITY = 85
+
+POST_IMAGE_PLACEHOLDER_SIZE = 16
+
+SEARCH_COMMENT_WEIGHT = 0.5
+
+# Доля запросов, которые замеряет core.middleware.ProfilingMiddleware.
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+
+PROFILING_WINDOW = 1000
+
+PROFILING_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+PROFILING_SLOW_REQUEST_MS = 500
+
+PROFILING_SLOW_QUERIES = 5
+
+# Сколько строк выгрузки читается из базы за один запрос.
+EXPORT_CHUNK_SIZE = 2000
+
+# Сколько символов текста поста хранит элемент ленты в кэше.
+FEED_TEXT_LENGTH = 2000
+
+# Комментариев на странице поста и в одной подгрузке.
+COMMENTS_PER_PAGE = 20
+
+# Токен-бакет комментариев: пять подряд, дальше один в десять секунд.
+COMMENT_THROTTLE_BURST = 5
+
+COMMENT_THROTTLE_RATE = 1 / 10
+
+# Без воркера run_tasks задачи выполняются в процессе запроса после
+# коммита, ошибки только логируются. В продакшене с воркером — TASKS_EAGER=0.
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '1') == '1'
+
+TASKS_WORKERS = 2
+
+TASKS_MAX_ATTEMPTS = 3
+
+# Секунды до первого повтора; дальше задержка удваивается.
+TASKS_RETRY_DELAY = 10
+
+# Сколько секунд задача принадлежит взявшему её воркеру.
+TASKS_LEASE = 300
+
+# Массивы подписок и подписчиков в кеше сбрасываются при каждой
+# подписке и отписке, так что таймаут лишь ограничивает память.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
@@ -13,16 +13,25 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import profiling_stats, serve_media
+
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.csrf_failure'
 handler500 = 'core.views.server_error'
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('admin/profiling/', profiling_stats, name='profiling'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        serve_media,
+        name='media',
+    ),
 ]